@@ -23,6 +23,9 @@ class Settings(BaseSettings):
     GOOGLE_AFTER_CONNECT: str
     S3_BUCKET_ARN: str
     DYNAMO_TRANSCRIPTIONS_TABLE: str
+    # Transfer tuning for S3Storage (multipart uploads/downloads)
+    S3_MAX_CONCURRENCY: int = 4
+    S3_MULTIPART_CHUNKSIZE_MB: int = 8
     
 
     class Config:
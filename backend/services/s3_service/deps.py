@@ -42,7 +42,12 @@ def register_s3_dependency(kernel: Kernel) -> None:
     def _factory(k: Kernel) -> S3Storage:
         settings = k.settings
         bucket_name = _normalize_bucket_name(settings.S3_BUCKET_ARN)
-        return S3Storage(bucket=bucket_name, region=settings.AWS_REGION)
+        return S3Storage(
+            bucket=bucket_name,
+            region=settings.AWS_REGION,
+            max_concurrency=settings.S3_MAX_CONCURRENCY,
+            multipart_chunksize_mb=settings.S3_MULTIPART_CHUNKSIZE_MB,
+        )
 
     kernel.register_capability(CAPABILITY_NAME, _factory)
 
@@ -1,6 +1,6 @@
 from __future__ import annotations
 import io
-from typing import List, Optional
+from typing import List, Optional, Tuple
 import boto3
 from botocore.config import Config
 from botocore.exceptions import ClientError
@@ -15,6 +15,7 @@ class S3Storage:
         kms_key_id: Optional[str] = None,
         multipart_threshold_mb: int = 8,  # tune as needed
         max_concurrency: int = 4,
+        multipart_chunksize_mb: int = 8,
     ):
         self.bucket = bucket
         self.kms_key_id = kms_key_id
@@ -30,20 +31,18 @@ class S3Storage:
         self.tcfg = TransferConfig(
             multipart_threshold=multipart_threshold_mb * 1024 * 1024,
             max_concurrency=max_concurrency,
-            multipart_chunksize=8 * 1024 * 1024,
+            multipart_chunksize=multipart_chunksize_mb * 1024 * 1024,
             use_threads=True,
         )
 
     # -------- Uploads --------
-    def upload_fileobj(
+    def _extra_args(
         self,
-        fileobj,
-        key: str,
         content_type: Optional[str] = None,
         cache_control: Optional[str] = None,
         metadata: Optional[dict] = None,
         public: bool = False,
-    ) -> str:
+    ) -> dict:
         extra = {}
         if content_type:
             extra["ContentType"] = content_type
@@ -58,7 +57,24 @@ class S3Storage:
             extra.update({"ServerSideEncryption": "aws:kms", "SSEKMSKeyId": self.kms_key_id})
         else:
             extra.update({"ServerSideEncryption": "AES256"})
+        return extra
 
+    def _object_url(self, key: str, public: bool) -> str:
+        # Prefer presigned URL for private objects
+        if public:
+            return f"https://{self.bucket}.s3.amazonaws.com/{key}"
+        return self.presign_get_url(key)
+
+    def upload_fileobj(
+        self,
+        fileobj,
+        key: str,
+        content_type: Optional[str] = None,
+        cache_control: Optional[str] = None,
+        metadata: Optional[dict] = None,
+        public: bool = False,
+    ) -> str:
+        extra = self._extra_args(content_type, cache_control, metadata, public)
         try:
             self.client.upload_fileobj(
                 Fileobj=fileobj,
@@ -70,10 +86,34 @@ class S3Storage:
         except ClientError as e:
             raise RuntimeError(f"S3 upload failed for {key}: {e}") from e
 
-        # Prefer presigned URL for private objects
-        if public:
-            return f"https://{self.bucket}.s3.amazonaws.com/{key}"
-        return self.presign_get_url(key)
+        return self._object_url(key, public)
+
+    def upload_bytes(
+        self,
+        data: bytes,
+        key: str,
+        content_type: Optional[str] = None,
+        cache_control: Optional[str] = None,
+        metadata: Optional[dict] = None,
+        public: bool = False,
+    ) -> str:
+        """Upload an in-memory payload.
+
+        Payloads below the multipart threshold go out as a single put_object,
+        skipping the TransferManager thread pool and the BytesIO wrapper.
+        """
+        if len(data) >= self.tcfg.multipart_threshold:
+            return self.upload_fileobj(
+                io.BytesIO(data), key, content_type, cache_control, metadata, public
+            )
+
+        extra = self._extra_args(content_type, cache_control, metadata, public)
+        try:
+            self.client.put_object(Bucket=self.bucket, Key=key, Body=data, **extra)
+        except ClientError as e:
+            raise RuntimeError(f"S3 upload failed for {key}: {e}") from e
+
+        return self._object_url(key, public)
 
     # -------- Downloads --------
     def download_to_path(self, key: str, dest_path: str) -> None:
@@ -88,8 +128,20 @@ class S3Storage:
         try:
             buf = io.BytesIO()
             self.client.download_fileobj(self.bucket, key, buf, Config=self.tcfg)
-            buf.seek(0)
-            return buf.read()
+            return buf.getvalue()
+        except ClientError as e:
+            if e.response["Error"]["Code"] in {"NoSuchKey", "404"}:
+                raise FileNotFoundError(key) from e
+            raise
+
+    def download_with_encoding(self, key: str) -> Tuple[bytes, Optional[str]]:
+        """Return the body and stored Content-Encoding from one get_object call.
+
+        Meant for small objects only: it skips the multipart TransferConfig download.
+        """
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=key)
+            return response["Body"].read(), response.get("ContentEncoding")
         except ClientError as e:
             if e.response["Error"]["Code"] in {"NoSuchKey", "404"}:
                 raise FileNotFoundError(key) from e
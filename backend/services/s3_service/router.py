@@ -1,3 +1,6 @@
+import asyncio
+from functools import partial
+from anyio import CapacityLimiter, to_thread
 from fastapi import APIRouter, File, HTTPException, UploadFile, Query, Depends
 from typing import List
 from fastapi.responses import StreamingResponse
@@ -9,12 +12,22 @@ from .functions import S3Storage
 from .schemas import PresignSignupReq
 import uuid
 import mimetypes
+import orjson
 from .deps import get_s3_storage
 
 router = APIRouter(prefix="/s3", tags=["s3"])
 
 all_users = RoleChecker(["client", "admin"])
 
+# Process-wide cap on worker threads used by the /recordings/{email} lookups.
+# Shared by all requests so that listings cannot exhaust AnyIO's default
+# 40-token threadpool that every other sync call depends on.
+_LIST_RECORDINGS_LIMITER = CapacityLimiter(16)
+
+# Translation results are stored gzip-compressed under this suffix by the
+# video-translator Lambda; only these need their Content-Encoding forwarded
+_GZIP_JSON_KEY_SUFFIX = "_translations.json"
+
 
 @router.post("/upload", response_model=str)
 async def upload_endpoint(
@@ -69,11 +82,9 @@ async def delete_endpoint(key: str, current_user: TokenData = Depends(get_curren
             transcription_prefix = f"uploads/{email}/transcripciones/{base_name}_"
             summary_prefix = f"uploads/{email}/resumenes/{base_name}_"
 
-            transcription_deleted = await run_in_threadpool(
-                lambda: s3.delete_prefix(transcription_prefix)
-            )
-            summary_deleted = await run_in_threadpool(
-                lambda: s3.delete_prefix(summary_prefix)
+            transcription_deleted, summary_deleted = await asyncio.gather(
+                run_in_threadpool(s3.delete_prefix, transcription_prefix),
+                run_in_threadpool(s3.delete_prefix, summary_prefix),
             )
 
         return {
@@ -137,17 +148,28 @@ async def download_stream(key: str):
         raise HTTPException(status_code=400, detail="Invalid key")
     s3: S3Storage = get_s3_storage()
     try:
-        data: bytes = await run_in_threadpool(lambda: s3.download_as_bytes(key))
+        if key.endswith(_GZIP_JSON_KEY_SUFFIX):
+            # Small gzip'd translation JSON: one GET returns body and encoding together
+            data, content_encoding = await run_in_threadpool(s3.download_with_encoding, key)
+        else:
+            data = await run_in_threadpool(s3.download_as_bytes, key)
+            content_encoding = None
 
         # Try to guess a reasonable content type from the key
         import mimetypes
 
         media_type = mimetypes.guess_type(key)[0] or "application/octet-stream"
 
+        headers = {"Content-Disposition": f'attachment; filename="{key.split("/")[-1]}"'}
+        # Objects stored compressed (e.g. gzip translation JSON) keep their encoding,
+        # so HTTP clients decompress them transparently
+        if content_encoding:
+            headers["Content-Encoding"] = content_encoding
+
         return StreamingResponse(
             content=iter([data]),
             media_type=media_type,
-            headers={"Content-Disposition": f'attachment; filename="{key.split("/")[-1]}"'},
+            headers=headers,
         )
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Object not found")
@@ -190,7 +212,7 @@ async def list_recordings(
         
         # Filter only video files (not in subdirectories)
         video_extensions = {'.mp4', '.mp3', '.wav', '.avi', '.mov', '.mkv'}
-        recordings = []
+        video_keys = []
         
         for key in all_keys:
             # Skip files in subdirectories (transcripciones/, resumenes/)
@@ -203,45 +225,47 @@ async def list_recordings(
             if ext not in video_extensions:
                 continue
             
-            filename = relative_path
+            video_keys.append((key, relative_path))
+        
+        def _lookup(func, *args, **kwargs):
+            return to_thread.run_sync(partial(func, *args, **kwargs), limiter=_LIST_RECORDINGS_LIMITER)
+        
+        async def _safe_metadata(key: str) -> dict:
+            try:
+                return await _lookup(s3.get_object_metadata, key)
+            except Exception:
+                return {}
+        
+        async def _describe(key: str, filename: str) -> dict:
             base_name = filename.rsplit('.', 1)[0]
-            
-            # Check for transcription
             transcription_prefix = f"uploads/{email}/transcripciones/{base_name}_"
-            transcription_keys = await run_in_threadpool(
-                lambda: s3.list_keys(prefix=transcription_prefix, max_items=10)
-            )
-            has_transcription = len(transcription_keys) > 0
-            
-            # Check for summary
             summary_prefix = f"uploads/{email}/resumenes/{base_name}_"
-            summary_keys = await run_in_threadpool(
-                lambda: s3.list_keys(prefix=summary_prefix, max_items=10)
-            )
-            has_summary = len(summary_keys) > 0
             
-            # Get file metadata
-            try:
-                metadata = await run_in_threadpool(lambda: s3.get_object_metadata(key))
-                size = metadata.get('ContentLength', 0)
-                uploaded_at = metadata.get('LastModified', '').isoformat() if metadata.get('LastModified') else None
-            except:
-                size = 0
-                uploaded_at = None
+            # The three lookups are independent, so they run concurrently
+            transcription_keys, summary_keys, metadata = await asyncio.gather(
+                _lookup(s3.list_keys, prefix=transcription_prefix, max_items=10),
+                _lookup(s3.list_keys, prefix=summary_prefix, max_items=10),
+                _safe_metadata(key),
+            )
+            last_modified = metadata.get('LastModified')
             
-            recordings.append({
+            return {
                 'filename': filename,
-                'size': size,
-                'uploaded_at': uploaded_at,
-                'has_transcription': has_transcription,
-                'has_summary': has_summary,
+                'size': metadata.get('ContentLength', 0),
+                'uploaded_at': last_modified.isoformat() if last_modified else None,
+                'has_transcription': len(transcription_keys) > 0,
+                'has_summary': len(summary_keys) > 0,
                 'transcription_file': transcription_keys[0] if transcription_keys else None,
                 'summary_file': summary_keys[0] if summary_keys else None,
-            })
+            }
+        
+        recordings = await asyncio.gather(
+            *(_describe(key, filename) for key, filename in video_keys)
+        )
         
         return {
             'email': email,
-            'recordings': recordings
+            'recordings': list(recordings)
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -278,9 +302,8 @@ async def get_transcription(
         latest_key = sorted(transcription_keys)[-1]
         
         # Download and parse JSON
-        import json
         transcription_bytes = await run_in_threadpool(lambda: s3.download_as_bytes(latest_key))
-        transcription_data = json.loads(transcription_bytes.decode('utf-8'))
+        transcription_data = orjson.loads(transcription_bytes)
         
         return transcription_data
         
@@ -321,9 +344,8 @@ async def get_summary(
         latest_key = sorted(summary_keys)[-1]
         
         # Download and parse JSON
-        import json
         summary_bytes = await run_in_threadpool(lambda: s3.download_as_bytes(latest_key))
-        summary_data = json.loads(summary_bytes.decode('utf-8'))
+        summary_data = orjson.loads(summary_bytes)
         
         return summary_data
         
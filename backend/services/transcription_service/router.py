@@ -1,14 +1,17 @@
 from __future__ import annotations
 
-import io
 import logging
 import time
 import uuid
 from datetime import datetime
+from functools import lru_cache
 from typing import Optional
 
 import boto3
 import requests
+from botocore.config import Config
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from fastapi import APIRouter, Depends, HTTPException, status as http_status
 from fastapi.concurrency import run_in_threadpool
 
@@ -41,6 +44,17 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["Transcriptions"])
 
+# Keep-alive pool reused across transcript downloads instead of a new TLS handshake per job.
+_http = requests.Session()
+_http.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=2,
+        pool_maxsize=8,
+        max_retries=Retry(total=3, backoff_factor=0.2, status_forcelist=(429, 502, 503, 504)),
+    ),
+)
+
 
 async def _resolve_user_email(current_user: TokenData) -> str:
     email = current_user.email or current_user.username
@@ -77,13 +91,31 @@ def _merge_status(
     return DEFAULT_STATUS, None, None
 
 
-def _guess_media_format(filename: str) -> Optional[str]:
+_MEDIA_FORMATS = frozenset({"mp3", "mp4", "wav", "flac", "m4a"})
+
+
+def _ext(filename: str) -> str:
     if "." not in filename:
-        return None
-    ext = filename.rsplit(".", 1)[-1].lower()
-    if ext in {"mp3", "mp4", "wav", "flac", "m4a"}:
-        return ext
-    return None
+        return ""
+    return filename.rsplit(".", 1)[-1].lower()
+
+
+@lru_cache(maxsize=16)
+def _format_for_ext(ext: str) -> Optional[str]:
+    return ext if ext in _MEDIA_FORMATS else None
+
+
+def _guess_media_format(filename: str) -> Optional[str]:
+    return _format_for_ext(_ext(filename))
+
+
+@lru_cache(maxsize=1)
+def _transcribe_client():
+    return boto3.client(
+        "transcribe",
+        region_name=settings.AWS_REGION,
+        config=Config(retries={"max_attempts": 5, "mode": "adaptive"}),
+    )
 
 
 def _transcribe_recording(
@@ -96,11 +128,12 @@ def _transcribe_recording(
     user_email: str,
     filename: str,
     poll_timeout_seconds: int = 300,
-    poll_interval_seconds: int = 5,
+    poll_interval_seconds: float = 2.0,
+    poll_max_interval_seconds: float = 30.0,
 ) -> tuple[str, dict]:
     """Run a Transcribe job and persist the final text into S3 and DynamoDB."""
 
-    transcribe_client = boto3.client("transcribe", region_name=settings.AWS_REGION)
+    transcribe_client = _transcribe_client()
     now_iso = datetime.utcnow().isoformat()
     base_item = {
         "recording_id": recording_id,
@@ -127,6 +160,8 @@ def _transcribe_recording(
 
     deadline = time.time() + poll_timeout_seconds
     last_job: Optional[dict] = None
+    # Exponential backoff: short jobs are picked up quickly and long ones do not flood the API
+    delay = poll_interval_seconds
     while time.time() < deadline:
         job = transcribe_client.get_transcription_job(TranscriptionJobName=job_name)[
             "TranscriptionJob"
@@ -141,14 +176,15 @@ def _transcribe_recording(
                 {**base_item, "status": STATUS_ERROR, "error_message": failure}
             )
             raise RuntimeError(f"Transcription failed: {failure}")
-        time.sleep(poll_interval_seconds)
+        time.sleep(min(delay, max(deadline - time.time(), 0)))
+        delay = min(delay * 1.5, poll_max_interval_seconds)
 
     if not last_job or last_job.get("TranscriptionJobStatus") != "COMPLETED":
         repo.upsert_status({**base_item, "status": STATUS_ERROR})
         raise RuntimeError("Transcription job did not complete before timeout")
 
     transcript_uri = last_job["Transcript"]["TranscriptFileUri"]
-    resp = requests.get(transcript_uri, timeout=30)
+    resp = _http.get(transcript_uri, timeout=30)
     resp.raise_for_status()
     payload = resp.json()
     transcripts = payload.get("results", {}).get("transcripts", [])
@@ -158,9 +194,7 @@ def _transcribe_recording(
         # Fallback to raw payload if needed
         transcription_text = payload.get("text", "")
 
-    buffer = io.BytesIO(transcription_text.encode("utf-8"))
-    buffer.seek(0)
-    s3.upload_fileobj(buffer, transcription_key, content_type="text/plain")
+    s3.upload_bytes(transcription_text.encode("utf-8"), transcription_key, content_type="text/plain")
 
     completed_item = {
         **base_item,
@@ -26,10 +26,10 @@ def decode_recording_id(recording_id: str) -> str:
 def extract_email_and_filename(key: str) -> Tuple[str, str]:
     """Return (email, filename) from a key shaped like uploads/<email>/<file>."""
 
-    parts = key.split("/")
+    parts = key.split("/", 2)
     if len(parts) < 3:
         raise ValueError("Recording key is not in the expected uploads/<email>/<file> format")
-    return parts[1], parts[-1]
+    return parts[1], parts[2].rsplit("/", 1)[-1]
 
 
 def build_transcription_key(email: str, filename: str) -> str:
@@ -3,18 +3,21 @@
 
 from __future__ import annotations
 
-import json
+import gzip
 import logging
 from datetime import datetime
 from typing import List, Optional
 
 import boto3
+import orjson
 from botocore.exceptions import ClientError, NoCredentialsError
 
 from core.config import settings
 
 logger = logging.getLogger(__name__)
 
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".wmv", ".flv", ".webm")
+
 # ---------------------------------------------------------------------
 # S3 Client
 # ---------------------------------------------------------------------
@@ -43,14 +46,12 @@ def list_video_files() -> List[dict]:
 
     try:
         bucket_name = get_bucket_name()
-        video_extensions = [".mp4", ".avi", ".mov", ".mkv", ".wmv", ".flv", ".webm"]
-
         response = s3_client.list_objects_v2(Bucket=bucket_name)
         videos: List[dict] = []
 
         for obj in response.get("Contents", []):
             key = obj["Key"]
-            if any(key.lower().endswith(ext) for ext in video_extensions):
+            if key.lower().endswith(VIDEO_EXTENSIONS):
                 has_translation = check_translation_exists(key)
                 videos.append(
                     {
@@ -109,7 +110,11 @@ def get_video_translation(video_key: str) -> Optional[dict]:
         bucket_name = get_bucket_name()
         translation_key = _translation_key_for_video(video_key)
         response = s3_client.get_object(Bucket=bucket_name, Key=translation_key)
-        return json.loads(response["Body"].read().decode("utf-8"))
+        body = response["Body"].read()
+        # La Lambda video-translator guarda el JSON comprimido (Content-Encoding: gzip)
+        if response.get("ContentEncoding") == "gzip":
+            body = gzip.decompress(body)
+        return orjson.loads(body)
     except ClientError as e:
         code = e.response.get("Error", {}).get("Code")
         if code in {"NoSuchKey", "404", "NotFound"}:
@@ -0,0 +1,238 @@
+import asyncio
+import threading
+import time
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import HTTPException
+from jwt.algorithms import RSAAlgorithm
+
+import utils.get_current_user_cognito as auth
+from core.config import settings
+
+KID = "test-kid"
+
+# One signing key for the module; RSA keygen is the slow part of these tests.
+_PRIVATE_KEY = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+_OTHER_PRIVATE_KEY = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+_JWK = {**RSAAlgorithm.to_jwk(_PRIVATE_KEY.public_key(), as_dict=True), "kid": KID}
+
+
+def _claims(**overrides):
+    now = int(time.time())
+    claims = {
+        "sub": "user-sub",
+        "iss": settings.COGNITO_ISSUER,
+        "client_id": settings.COGNITO_CLIENT_ID,
+        "token_use": "access",
+        "exp": now + 300,
+        "iat": now,
+        # email/username presentes: no hace falta enriquecer contra Cognito
+        "email": "user@example.com",
+        "cognito:username": "user@example.com",
+        "cognito:groups": ["client"],
+    }
+    claims.update(overrides)
+    return claims
+
+
+def _mint(claims=None, *, key=_PRIVATE_KEY, kid=KID):
+    return jwt.encode(claims or _claims(), key, algorithm="RS256", headers={"kid": kid})
+
+
+def _authenticate(token):
+    return asyncio.run(auth.get_current_user(token))
+
+
+@pytest.fixture(autouse=True)
+def _local_jwks(monkeypatch):
+    """Serve the local JWK instead of Cognito's and start every test with cold caches."""
+    fetches = []
+
+    def _fake_fetch():
+        fetches.append(time.monotonic())
+        return {KID: _JWK}
+
+    monkeypatch.setattr(auth, "_fetch_jwks", _fake_fetch)
+    monkeypatch.setattr(auth, "_jwks_keys", {})
+    monkeypatch.setattr(auth, "_jwks_fetched_at", 0.0)
+    monkeypatch.setattr(auth, "_jwks_attempted_at", float("-inf"))
+    auth._token_cache.clear()
+    auth._profile_cache.clear()
+    auth._load_public_key.cache_clear()
+    yield fetches
+    auth._token_cache.clear()
+
+
+def _assert_rejected(token, detail=None):
+    with pytest.raises(HTTPException) as exc_info:
+        _authenticate(token)
+    assert exc_info.value.status_code == 401
+    if detail is not None:
+        assert exc_info.value.detail == detail
+
+
+def test_valid_token_is_accepted():
+    data = _authenticate(_mint())
+
+    assert data.sub == "user-sub"
+    assert data.email == "user@example.com"
+    assert data.token_use == "access"
+    assert data.groups == ["client"]
+
+
+def test_tampered_payload_is_rejected():
+    header, _, signature = _mint().split(".")
+    _, forged_payload, _ = _mint(_claims(sub="attacker")).split(".")
+
+    _assert_rejected(f"{header}.{forged_payload}.{signature}", "Invalid token signature")
+
+
+def test_signature_from_another_key_is_rejected():
+    _assert_rejected(_mint(key=_OTHER_PRIVATE_KEY), "Invalid token signature")
+
+
+@pytest.mark.parametrize("token", ["abc", "a.b", "a.b.c.d"])
+def test_malformed_token_is_rejected(token):
+    _assert_rejected(token, "Malformed token")
+
+
+def test_undecodable_segments_are_rejected():
+    _assert_rejected("not-base64!.payload.sig")
+
+
+def test_unknown_kid_is_rejected():
+    _assert_rejected(_mint(kid="rotated-away"), "Key not found in JWKS")
+
+
+def test_wrong_issuer_is_rejected():
+    _assert_rejected(_mint(_claims(iss="https://evil.example.com")), "Invalid issuer")
+
+
+def test_wrong_client_id_is_rejected():
+    _assert_rejected(_mint(_claims(client_id="someone-else")), "Invalid audience")
+
+
+def test_expired_token_is_rejected():
+    _assert_rejected(_mint(_claims(exp=int(time.time()) - 1)), "Token expired")
+
+
+def test_id_token_is_rejected():
+    _assert_rejected(_mint(_claims(token_use="id")), "Invalid token use")
+
+
+def _count_verifications(monkeypatch):
+    calls = []
+    verify = auth._verify_signature_and_get_claims
+
+    def _counting(token):
+        calls.append(token)
+        return verify(token)
+
+    monkeypatch.setattr(auth, "_verify_signature_and_get_claims", _counting)
+    return calls
+
+
+def test_cached_token_skips_verification(monkeypatch):
+    calls = _count_verifications(monkeypatch)
+    token = _mint()
+
+    first = _authenticate(token)
+    second = _authenticate(token)
+
+    assert second == first
+    assert len(calls) == 1
+
+
+def test_cached_token_is_not_served_after_exp(monkeypatch):
+    calls = _count_verifications(monkeypatch)
+    now = time.time()
+    token = _mint(_claims(exp=int(now) + 30))
+    _authenticate(token)
+
+    # el TLRU aún guarda la entrada (su reloj no avanza), pero 'exp' ya pasó
+    monkeypatch.setattr(time, "time", lambda: now + 31)
+    _assert_rejected(token, "Token expired")
+    assert len(calls) == 2
+
+
+def test_token_cache_ttu_is_capped_by_exp():
+    data = auth.TokenData(sub="s", token_use="access", exp=1_000_030)
+
+    assert auth._token_ttu(b"k", data, 1_000_000) == 1_000_030
+    assert auth._token_ttu(b"k", data, 900_000) == 900_000 + auth._TOKEN_CACHE_TTL_SECONDS
+
+
+def test_unknown_kid_refreshes_jwks_at_most_once_per_window(monkeypatch, _local_jwks):
+    clock = [1_000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: clock[0])
+
+    assert auth._find_key(KID) == _JWK  # caché vacía: primera descarga
+    for _ in range(5):
+        assert auth._find_key("unknown") is None
+    assert len(_local_jwks) == 1
+
+    clock[0] += auth._JWKS_MISS_REFRESH_SECONDS - 1
+    assert auth._find_key("unknown") is None
+    assert len(_local_jwks) == 1
+
+    clock[0] += 2
+    auth._find_key("unknown")
+    auth._find_key("unknown")
+    assert len(_local_jwks) == 2
+
+
+def test_failed_background_refresh_is_retried_at_most_once_per_window(monkeypatch):
+    clock = [10_000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: clock[0])
+    fetches = []
+
+    def _failing_fetch():
+        fetches.append(clock[0])
+        raise ConnectionError("cognito unavailable")
+
+    monkeypatch.setattr(auth, "_fetch_jwks", _failing_fetch)
+    monkeypatch.setattr(auth, "_jwks_keys", {KID: _JWK})
+    monkeypatch.setattr(auth, "_jwks_fetched_at", clock[0] - auth._JWKS_TTL_SECONDS - 1)
+
+    def _lookup():
+        assert auth._find_key(KID) == _JWK  # la clave cacheada se sigue sirviendo
+        with auth._jwks_refresh_lock:  # espera a que termine el hilo de refresco
+            pass
+
+    for _ in range(5):
+        _lookup()
+    assert len(fetches) == 1
+
+    clock[0] += auth._JWKS_MISS_REFRESH_SECONDS - 1
+    _lookup()
+    assert len(fetches) == 1
+
+    clock[0] += 2
+    _lookup()
+    _lookup()
+    assert len(fetches) == 2
+
+
+def test_concurrent_unknown_kid_lookups_share_one_refresh(monkeypatch):
+    fetches = []
+
+    def _slow_fetch():
+        fetches.append(1)
+        time.sleep(0.05)
+        return {KID: _JWK}
+
+    monkeypatch.setattr(auth, "_fetch_jwks", _slow_fetch)
+    monkeypatch.setattr(auth, "_jwks_keys", {KID: _JWK})
+    monkeypatch.setattr(
+        auth, "_jwks_fetched_at", time.monotonic() - auth._JWKS_MISS_REFRESH_SECONDS - 1
+    )
+
+    threads = [threading.Thread(target=auth._find_key, args=("unknown",)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(fetches) == 1
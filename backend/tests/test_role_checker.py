@@ -0,0 +1,33 @@
+import pytest
+from fastapi import HTTPException
+
+from utils.RoleChecker import RoleChecker
+from utils.get_current_user_cognito import TokenData
+
+
+def _user(groups, email="user@example.com"):
+    return TokenData(sub="user-sub", email=email, token_use="access", exp=2_000_000_000, groups=groups)
+
+
+def test_member_group_is_allowed():
+    checker = RoleChecker(["client", "admin"])
+
+    assert checker(_user(["admin"])) is None
+
+
+@pytest.mark.parametrize("groups", [["guest"], []], ids=["disjoint", "empty"])
+def test_non_member_is_forbidden(groups):
+    checker = RoleChecker(["client", "admin"])
+
+    with pytest.raises(HTTPException) as exc_info:
+        checker(_user(groups))
+    assert exc_info.value.status_code == 403
+    assert exc_info.value.detail == "Operation not permitted"
+
+
+def test_missing_email_is_forbidden():
+    checker = RoleChecker(["client"])
+
+    with pytest.raises(HTTPException) as exc_info:
+        checker(_user(["client"], email=None))
+    assert exc_info.value.status_code == 403
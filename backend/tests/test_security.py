@@ -1,186 +1,331 @@
+import re
+from urllib.parse import quote, unquote, urlsplit
+
 import pytest
+from botocore.stub import Stubber
 from fastapi.testclient import TestClient
 from main import app
+from core.config import settings
+from services.calendar_service.integrations.google.calendar import dynamo_google_table
+from services.s3_service.deps import get_s3_storage
+from utils.cognito_repository import get_cognito_client
+from utils.get_current_user_cognito import TokenData, get_current_user
+
+TEST_EMAIL = "test@example.com"
+TEST_USER = TokenData(
+    sub="test-sub",
+    username=TEST_EMAIL,
+    email=TEST_EMAIL,
+    token_use="access",
+    exp=2**31 - 1,
+    groups=["client"],
+)
+
+
+@pytest.fixture(scope="module")
+def client():
+    """Build the ASGI app and its TestClient once for the whole module.
+
+    Authenticated routes resolve ``get_current_user`` to ``TEST_USER`` so the
+    S3 and calendar payloads reach their handlers instead of stopping at a 401.
+    """
+    app.dependency_overrides[get_current_user] = lambda: TEST_USER
+    with TestClient(app) as test_client:
+        yield test_client
+    app.dependency_overrides.pop(get_current_user, None)
+
+
+@pytest.fixture(scope="module", autouse=True)
+def _stub_cognito():
+    """Stub the shared Cognito client so no call ever leaves the process.
 
-client = TestClient(app)
-
-# Payloads for testing
-sql_injection_payloads = [
-    "' OR 1=1 --",
-    "' OR '1'='1",
-    "admin'--",
-    "admin'/*",
-    "admin' or 1=1#",
-    "1' UNION SELECT 1,2,3,4,5,6,7,8,9,10--",
-    "'; EXEC xp_cmdshell('echo vulnerable') --",
-]
-
-xss_payloads = [
-    "<script>alert('XSS')</script>",
-    "<img src=x onerror=alert('XSS')>",
-    '\'"\'><script>alert(\"XSS\")</script>',
-    "<body onload=alert('XSS')>",
-]
-
-
-@pytest.mark.parametrize("payload", sql_injection_payloads)
-def test_sql_injection_login(payload):
+    Each test queues the answers Cognito would give; an unqueued call fails
+    in-process instead of making a network round-trip.
     """
-    Tests for SQL injection vulnerabilities on the /auth/login endpoint.
+    stubber = Stubber(get_cognito_client())
+    stubber.activate()
+    yield stubber
+    stubber.deactivate()
+
+
+@pytest.fixture(scope="module")
+def s3_stub():
+    """Stub the shared S3Storage client; each test queues the calls it expects."""
+    stubber = Stubber(get_s3_storage().client)
+    stubber.activate()
+    yield stubber
+    stubber.deactivate()
+
+
+@pytest.fixture(scope="module")
+def dynamo_stub():
+    """Stub the Google tokens table so calendar routes see a user with no linked calendar."""
+    stubber = Stubber(dynamo_google_table.ddb.meta.client)
+    stubber.activate()
+    yield stubber
+    stubber.deactivate()
+
+
+def _queue_no_google_tokens(stubber):
+    stubber.add_response(
+        "get_item",
+        {},
+        expected_params={
+            "TableName": settings.DYNAMO_GOOGLE_TOKENS_TABLE,
+            "Key": {"user_sub": TEST_USER.sub},
+        },
+    )
+
+
+# Payloads for testing, keyed by the short slug used in their test ids
+_SQL_INJECTION_CASES = {
+    "or-1-eq-1": "' OR 1=1 --",
+    "or-quoted-1-eq-1": "' OR '1'='1",
+    "admin-line-comment": "admin'--",
+    "admin-block-comment": "admin'/*",
+    "admin-or-hash-comment": "admin' or 1=1#",
+    "union-select": "1' UNION SELECT 1,2,3,4,5,6,7,8,9,10--",
+    "exec-xp-cmdshell": "'; EXEC xp_cmdshell('echo vulnerable') --",
+}
+
+_XSS_CASES = {
+    "script-tag": "<script>alert('XSS')</script>",
+    "img-onerror": "<img src=x onerror=alert('XSS')>",
+    "attr-breakout-script": '\'"\'><script>alert(\"XSS\")</script>',
+    "body-onload": "<body onload=alert('XSS')>",
+}
+
+sql_injection_payloads = list(_SQL_INJECTION_CASES.values())
+xss_payloads = list(_XSS_CASES.values())
+SQL_INJECTION_IDS = [f"sqli-{slug}" for slug in _SQL_INJECTION_CASES]
+XSS_IDS = [f"xss-{slug}" for slug in _XSS_CASES]
+
+# Built once at import so the parametrize decorators below share one tuple.
+ALL_INJECTION_PAYLOADS = tuple(sql_injection_payloads + xss_payloads)
+ALL_INJECTION_IDS = SQL_INJECTION_IDS + XSS_IDS
+
+# One alternation over every payload: a single scan of the body finds any reflection.
+_PAYLOAD_RE = re.compile("|".join(map(re.escape, ALL_INJECTION_PAYLOADS)))
+
+
+def _signup_body(**overrides):
+    """Return a Cognito signup body that passes schema validation, with ``overrides`` applied."""
+    body = {
+        "nickname": "tester",
+        "email": "test@example.com",
+        "address": "123 Main St",
+        "birthdate": "2000-01-01",
+        "gender": "other",
+        "picture": "http://example.com/pic.jpg",
+        "phone_number": "+1234567890",
+        "family_name": "User",
+        "name": "Test",
+        "password": "Password123!",
+    }
+    body.update(overrides)
+    return body
+
+
+def _queue_login_rejections(stubber, count):
+    """Answer the next ``count`` InitiateAuth calls the way Cognito answers bad credentials."""
+    for _ in range(count):
+        stubber.add_client_error(
+            "initiate_auth",
+            service_error_code="NotAuthorizedException",
+            service_message="Incorrect username or password.",
+            http_status_code=400,
+        )
+
+
+def _queue_signups(stubber, count):
+    """Answer the next ``count`` SignUp calls with an unconfirmed new user."""
+    for _ in range(count):
+        stubber.add_response(
+            "sign_up",
+            {"UserConfirmed": False, "UserSub": "00000000-0000-0000-0000-000000000000"},
+        )
+
+
+@pytest.mark.parametrize("payload", sql_injection_payloads, ids=SQL_INJECTION_IDS)
+def test_sql_injection_login(client, _stub_cognito, payload):
+    """
+    Tests for SQL injection vulnerabilities on the /api/cognito/auth/login endpoint.
     """
-    response = client.post("/auth/login", json={"email": payload, "password": "password"})
+    _queue_login_rejections(_stub_cognito, 1)
+    response = client.post("/api/cognito/auth/login", json={"email": payload, "password": "password"})
     assert response.status_code != 500, f"SQL Injection attempt returned a 500 error with payload: {payload}"
-    assert response.status_code in [401, 404, 422], (
-        f"Unexpected status code {response.status_code} for payload: {payload}"
-    )
+    assert response.status_code == 400, f"Unexpected status code {response.status_code} for payload: {payload}"
+    _stub_cognito.assert_no_pending_responses()
 
 
-@pytest.mark.parametrize("payload", xss_payloads)
-def test_xss_login(payload):
+@pytest.mark.parametrize("payload", xss_payloads, ids=XSS_IDS)
+def test_xss_login(client, _stub_cognito, payload):
     """
-    Tests for XSS vulnerabilities on the /auth/login endpoint.
+    Tests for XSS vulnerabilities on the /api/cognito/auth/login endpoint.
     """
-    response = client.post("/auth/login", json={"email": payload, "password": "password"})
-    assert response.status_code != 500
-    assert payload not in response.text, f"XSS payload reflected in response from /auth/login: {payload}"
+    _queue_login_rejections(_stub_cognito, 1)
+    response = client.post("/api/cognito/auth/login", json={"email": payload, "password": "password"})
+    assert response.status_code == 400
+    assert not _PAYLOAD_RE.search(response.text), (
+        f"XSS payload reflected in response from /api/cognito/auth/login: {payload}"
+    )
+    _stub_cognito.assert_no_pending_responses()
 
 
-@pytest.mark.parametrize("payload", sql_injection_payloads)
-def test_sql_injection_signup_email(payload):
+@pytest.mark.parametrize("payload", sql_injection_payloads, ids=SQL_INJECTION_IDS)
+def test_sql_injection_signup_email(client, payload):
     """
-    Tests for SQL injection vulnerabilities on the /auth/signup endpoint in the email field.
+    Tests for SQL injection vulnerabilities on the /api/cognito/auth/signup endpoint in the email field.
     """
-    user_data = {
-        "email": payload,
-        "password": "testpassword",
-        "first_name": "Test",
-        "last_name": "User",
-        "role": "user",
-    }
-    response = client.post("/auth/signup", json=user_data)
+    response = client.post("/api/cognito/auth/signup", json=_signup_body(email=payload))
     assert response.status_code != 500, f"SQL Injection attempt returned a 500 error with payload: {payload}"
-    assert response.status_code in [400, 422, 404], (
-        f"Unexpected status code {response.status_code} for payload: {payload}"
-    )
+    # EmailStr rejects every payload before Cognito is called
+    assert response.status_code == 422, f"Unexpected status code {response.status_code} for payload: {payload}"
 
 
-@pytest.mark.parametrize("payload", xss_payloads)
-def test_xss_signup(payload):
+@pytest.mark.parametrize("payload", xss_payloads, ids=XSS_IDS)
+def test_xss_signup(client, _stub_cognito, payload):
     """
-    Tests for XSS vulnerabilities on the /auth/signup endpoint.
+    Tests for XSS vulnerabilities on the /api/cognito/auth/signup endpoint.
     """
-    user_data = {
-        "email": "test@example.com",
-        "password": "testpassword",
-        "first_name": payload,
-        "last_name": "User",
-        "role": "user",
-    }
-    response = client.post("/auth/signup", json=user_data)
-    assert response.status_code != 500
-    # Pydantic usually catches this and returns a 422, but we check for reflection just in case.
-    assert payload not in response.text, f"XSS payload reflected in response from /auth/signup: {payload}"
+    _queue_signups(_stub_cognito, 1)
+    response = client.post("/api/cognito/auth/signup", json=_signup_body(name=payload))
+    assert response.status_code == 200
+    assert not _PAYLOAD_RE.search(response.text), (
+        f"XSS payload reflected in response from /api/cognito/auth/signup: {payload}"
+    )
+    _stub_cognito.assert_no_pending_responses()
 
 
-@pytest.mark.parametrize("payload", sql_injection_payloads)
-def test_sql_injection_signup_other_fields(payload):
+@pytest.mark.parametrize("payload", sql_injection_payloads, ids=SQL_INJECTION_IDS)
+def test_sql_injection_signup_other_fields(client, _stub_cognito, payload):
     """
-    Tests for SQL injection vulnerabilities on the /auth/signup endpoint in other text fields.
+    Tests for SQL injection vulnerabilities on the /api/cognito/auth/signup endpoint in other text fields.
     """
-    user_data = {
-        "email": "test@example.com",
-        "password": "testpassword",
-        "first_name": payload,
-        "last_name": payload,
-        "role": "user",
-    }
-    response = client.post("/auth/signup", json=user_data)
+    _queue_signups(_stub_cognito, 1)
+    response = client.post("/api/cognito/auth/signup", json=_signup_body(name=payload, family_name=payload))
     assert response.status_code != 500, f"SQL Injection attempt returned a 500 error with payload: {payload}"
-    assert response.status_code in [400, 422, 404], (
-        f"Unexpected status code {response.status_code} for payload: {payload}"
-    )
+    # Attribute values are opaque strings to Cognito, so the signup goes through
+    assert response.status_code == 200, f"Unexpected status code {response.status_code} for payload: {payload}"
+    _stub_cognito.assert_no_pending_responses()
 
 
 # Cognito Router Tests
 
 
-@pytest.mark.parametrize("payload", sql_injection_payloads + xss_payloads)
-def test_cognito_signup_injection(payload):
-    user_data = {
-        "nickname": payload,
-        "email": "test@example.com",
-        "address": "123 Main St",
-        "birthdate": "2000-01-01",
-        "gender": "other",
-        "picture": "http://example.com/pic.jpg",
-        "phone_number": "+1234567890",
-        "family_name": payload,
-        "name": payload,
-        "password": "Password123!",
-    }
-    response = client.post("/cognito/auth/signup", json=user_data)
-    assert response.status_code != 500
-    assert payload not in response.text
+def _assert_clean_response(response, payload):
+    """The body neither echoes the payload nor leaks a Python traceback."""
+    assert not _PAYLOAD_RE.search(response.text), f"Payload reflected in response: {payload}"
+    assert "Traceback" not in response.text, f"Stack trace leaked in response for payload: {payload}"
 
 
-@pytest.mark.parametrize("payload", sql_injection_payloads + xss_payloads)
-def test_cognito_login_injection(payload):
-    login_data = {"email": payload, "password": payload}
-    response = client.post("/cognito/auth/login", json=login_data)
-    assert response.status_code != 500
-    assert payload not in response.text
+@pytest.mark.parametrize("payload", ALL_INJECTION_PAYLOADS, ids=ALL_INJECTION_IDS)
+def test_cognito_signup_injection(client, _stub_cognito, payload):
+    _queue_signups(_stub_cognito, 1)
+    user_data = _signup_body(nickname=payload, family_name=payload, name=payload)
+    response = client.post("/api/cognito/auth/signup", json=user_data)
+    # Attribute values are opaque strings to Cognito, so the signup goes through
+    assert response.status_code == 200
+    _assert_clean_response(response, payload)
+    _stub_cognito.assert_no_pending_responses()
 
 
-@pytest.mark.parametrize("payload", sql_injection_payloads + xss_payloads)
-def test_cognito_confirm_injection(payload):
+@pytest.mark.parametrize("payload", ALL_INJECTION_PAYLOADS, ids=ALL_INJECTION_IDS)
+def test_cognito_login_injection(client, _stub_cognito, payload):
+    _queue_login_rejections(_stub_cognito, 1)
+    login_data = {"email": payload, "password": payload}
+    response = client.post("/api/cognito/auth/login", json=login_data)
+    assert response.status_code == 400
+    _assert_clean_response(response, payload)
+    _stub_cognito.assert_no_pending_responses()
+
+
+@pytest.mark.parametrize("payload", ALL_INJECTION_PAYLOADS, ids=ALL_INJECTION_IDS)
+def test_cognito_confirm_injection(client, _stub_cognito, payload):
+    # Cognito validates ConfirmationCode against [\S]+ before comparing it
+    if re.search(r"\s", payload):
+        error_code, message = "InvalidParameterException", "1 validation error detected: Value at 'confirmationCode'"
+    else:
+        error_code, message = "CodeMismatchException", "Invalid verification code provided, please try again."
+    _stub_cognito.add_client_error(
+        "confirm_sign_up",
+        service_error_code=error_code,
+        service_message=message,
+        http_status_code=400,
+    )
     confirm_data = {"email": "test@example.com", "code": payload}
-    response = client.post("/cognito/auth/confirm", json=confirm_data)
-    assert response.status_code != 500
-    assert payload not in response.text
+    response = client.post("/api/cognito/auth/confirm", json=confirm_data)
+    assert response.status_code == 400
+    _assert_clean_response(response, payload)
+    _stub_cognito.assert_no_pending_responses()
 
 
 # S3 Service Tests
 
 
 @pytest.mark.parametrize("payload", ["../", "..%2F", "..%5C"])
-def test_s3_path_traversal_upload(payload):
-    response = client.post(f"/s3/upload?folder={payload}", files={"file": ("test.txt", b"test content")})
-    assert response.status_code != 500
-    # This is a basic check. A more robust check would verify that the file was not uploaded to an unintended location.
-    # For now, we just check that the server doesn't crash.
+def test_s3_path_traversal_upload(client, s3_stub, payload):
+    s3_stub.add_response("put_object", {})
+    response = client.post(f"/api/s3/upload?folder={payload}", files={"file": ("test.txt", b"test content")})
+    assert response.status_code == 200
+    s3_stub.assert_no_pending_responses()
+    # S3 keys are flat strings: ".." is part of the key name and the object
+    # still lands under the caller's own email segment
+    key = unquote(urlsplit(response.json()).path).lstrip("/")
+    assert key == f"{unquote(payload)}/{TEST_EMAIL}/test.txt"
 
 
 @pytest.mark.parametrize("payload", ["../", "..%2F", "..%5C"])
-def test_s3_path_traversal_list(payload):
-    response = client.get(f"/s3/list?folder={payload}")
-    assert response.status_code != 500
+def test_s3_path_traversal_list(client, s3_stub, payload):
+    # S3 keys are flat strings: the listing stays under the caller's own email segment
+    s3_stub.add_response(
+        "list_objects_v2",
+        {"Contents": []},
+        expected_params={"Bucket": get_s3_storage().bucket, "Prefix": f"{unquote(payload)}/{TEST_EMAIL}/"},
+    )
+    response = client.get(f"/api/s3/list?folder={payload}")
+    assert response.status_code == 200
+    assert response.json() == []
+    s3_stub.assert_no_pending_responses()
 
 
-@pytest.mark.parametrize("payload", sql_injection_payloads + xss_payloads)
-def test_s3_presign_setup_injection(payload):
+@pytest.mark.parametrize("payload", ALL_INJECTION_PAYLOADS, ids=ALL_INJECTION_IDS)
+def test_s3_presign_setup_injection(client, payload):
     req_data = {"email": payload, "filename": payload, "content_type": "image/jpeg"}
-    response = client.post("/s3/presign-setup", json=req_data)
-    assert response.status_code != 500
+    response = client.post("/api/s3/presign-setup", json=req_data)
+    # EmailStr rejects every payload before a URL is signed
+    assert response.status_code == 422
 
 
-@pytest.mark.parametrize("payload", ["../", "..%2F", "..%5C"])
-def test_s3_path_traversal_download(payload):
-    response = client.get(f"/s3/download/{payload}")
-    assert response.status_code != 500
+@pytest.mark.parametrize(
+    ("payload", "status_code"),
+    [
+        # The HTTP client collapses a bare "../" segment, so no route matches
+        ("../", 404),
+        ("..%2F", 400),
+        ("..%5C", 400),
+    ],
+)
+def test_s3_path_traversal_download(client, payload, status_code):
+    response = client.get(f"/api/s3/download/{payload}")
+    assert response.status_code == status_code
 
 
 # Calendar Service Tests
 
 
-@pytest.mark.parametrize("payload", sql_injection_payloads + xss_payloads)
-def test_calendar_events_list_injection(payload):
-    response = client.get(f"/calendar/events?tz={payload}")
-    assert response.status_code != 500
-    assert payload not in response.text
+@pytest.mark.parametrize("payload", ALL_INJECTION_PAYLOADS, ids=ALL_INJECTION_IDS)
+def test_calendar_events_list_injection(client, dynamo_stub, payload):
+    _queue_no_google_tokens(dynamo_stub)
+    response = client.get(f"/api/calendar/events?tz={quote(payload)}")
+    assert response.status_code == 409
+    assert not _PAYLOAD_RE.search(response.text), f"Payload reflected in response: {payload}"
+    dynamo_stub.assert_no_pending_responses()
 
 
-@pytest.mark.parametrize("payload", sql_injection_payloads + xss_payloads)
-def test_calendar_events_create_injection(payload):
+@pytest.mark.parametrize("payload", ALL_INJECTION_PAYLOADS, ids=ALL_INJECTION_IDS)
+def test_calendar_events_create_injection(client, dynamo_stub, payload):
+    _queue_no_google_tokens(dynamo_stub)
     event_data = {
         "summary": payload,
         "description": payload,
@@ -190,20 +335,34 @@ def test_calendar_events_create_injection(payload):
         "timezone": "UTC",
         "attendees": [payload],
     }
-    response = client.post("/calendar/events", json=event_data)
-    assert response.status_code != 500
-    assert payload not in response.text
-
-
-@pytest.mark.parametrize("payload", sql_injection_payloads + xss_payloads)
-def test_calendar_events_update_injection(payload):
-    response = client.patch(f"/calendar/events/{payload}", json={"summary": payload})
-    assert response.status_code != 500
-    assert payload not in response.text
-
-
-@pytest.mark.parametrize("payload", sql_injection_payloads + xss_payloads)
-def test_calendar_events_delete_injection(payload):
-    response = client.delete(f"/calendar/events/{payload}")
-    assert response.status_code != 500
-    assert payload not in response.text
+    response = client.post("/api/calendar/events", json=event_data)
+    assert response.status_code == 409
+    assert not _PAYLOAD_RE.search(response.text), f"Payload reflected in response: {payload}"
+    dynamo_stub.assert_no_pending_responses()
+
+
+def _event_path_status(payload):
+    # Starlette routes on the decoded path, so an id with "/" never matches {event_id}
+    return 404 if "/" in payload else 409
+
+
+@pytest.mark.parametrize("payload", ALL_INJECTION_PAYLOADS, ids=ALL_INJECTION_IDS)
+def test_calendar_events_update_injection(client, dynamo_stub, payload):
+    status_code = _event_path_status(payload)
+    if status_code == 409:
+        _queue_no_google_tokens(dynamo_stub)
+    response = client.patch(f"/api/calendar/events/{quote(payload, safe='')}", json={"summary": payload})
+    assert response.status_code == status_code
+    assert not _PAYLOAD_RE.search(response.text), f"Payload reflected in response: {payload}"
+    dynamo_stub.assert_no_pending_responses()
+
+
+@pytest.mark.parametrize("payload", ALL_INJECTION_PAYLOADS, ids=ALL_INJECTION_IDS)
+def test_calendar_events_delete_injection(client, dynamo_stub, payload):
+    status_code = _event_path_status(payload)
+    if status_code == 409:
+        _queue_no_google_tokens(dynamo_stub)
+    response = client.delete(f"/api/calendar/events/{quote(payload, safe='')}")
+    assert response.status_code == status_code
+    assert not _PAYLOAD_RE.search(response.text), f"Payload reflected in response: {payload}"
+    dynamo_stub.assert_no_pending_responses()
@@ -0,0 +1,56 @@
+import pytest
+
+from services.transcription_service.utils import (
+    build_transcription_key,
+    decode_recording_id,
+    encode_recording_id,
+    extract_email_and_filename,
+)
+
+# (email, filename) pairs covering Unicode, dates and odd punctuation in keys.
+RECORDINGS = [
+    ("user@example.com", "meeting.mp4"),
+    ("user@example.com", "2025-09-05 reunión.mp3"),
+    ("ana.maría@ejemplo.co", "entrevista_final.wav"),
+    ("first+tag@example.com", "standup-2025-01-01T09:00:00.m4a"),
+    ("user@example.com", "sin_extension"),
+    ("user@example.com", "weekly sync (1).mp4"),
+    ("josé@dominio.com", "presentación.mov"),
+    ("user@example.com", "日本語の会議.mp4"),
+    ("user@example.com", "встреча.flac"),
+    ("user@example.com", "emoji 🎤 talk.mp3"),
+    ("user@example.com", "05-09-2025.mp4"),
+    ("user@example.com", "2025_09_05_10h30.wav"),
+    ("user@example.com", "a.b.c.d.mp4"),
+    ("user@example.com", "100% done.mp3"),
+    ("user@example.com", "name with   spaces.mp4"),
+    ("user@example.com", "q&a session.m4a"),
+    ("user@example.com", "über-café.mp4"),
+    ("UPPER@EXAMPLE.COM", "UPPER.MP4"),
+    ("user_1@sub.example.org", "x"),
+    ("user@example.com", "año nuevo ñandú.mp3"),
+]
+
+
+@pytest.mark.parametrize("email, filename", RECORDINGS)
+def test_parse_recording_key_roundtrip(email, filename):
+    key = f"uploads/{email}/{filename}"
+    recording_id = encode_recording_id(key)
+
+    assert "=" not in recording_id
+    assert decode_recording_id(recording_id) == key
+    assert extract_email_and_filename(key) == (email, filename)
+    assert build_transcription_key(email, filename) == f"transcripciones/{email}/{filename}.txt"
+
+
+def test_extract_email_and_filename_uses_last_segment():
+    assert extract_email_and_filename("uploads/user@example.com/nested/dir/file.mp4") == (
+        "user@example.com",
+        "file.mp4",
+    )
+
+
+@pytest.mark.parametrize("key", ["", "uploads", "uploads/user@example.com"])
+def test_extract_email_and_filename_rejects_short_keys(key):
+    with pytest.raises(ValueError):
+        extract_email_and_filename(key)
@@ -1,33 +1,72 @@
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError
 from fastapi import HTTPException
 from core.config import settings
 import hmac
-import hashlib
 import base64
+from functools import lru_cache
+from operator import itemgetter
 from time import time
 from urllib.parse import quote
 
 
+_SIGNUP_ATTR_KEYS = (
+    "nickname",
+    "address",
+    "birthdate",
+    "gender",
+    "picture",
+    "phone_number",
+    "family_name",
+    "name",
+)
+_signup_attr_values = itemgetter(*_SIGNUP_ATTR_KEYS)
+
+_OTPAUTH_ISSUER = "MIWA"
+_OTPAUTH_TMPL = (
+    "otpauth://totp/{label}?secret={secret}&issuer="
+    + quote(_OTPAUTH_ISSUER)
+    + "&algorithm=SHA1&digits=6&period=30"
+)
+
+
+@lru_cache(maxsize=4096)
+def _compute_secret_hash(email: str, client_id: str, secret: bytes) -> str:
+    digest = hmac.digest(secret, (email + client_id).encode("utf-8"), "sha256")
+    return base64.b64encode(digest).decode()
+
+
+@lru_cache(maxsize=1)
+def get_cognito_client():
+    """Return the process-wide Cognito client shared by every caller."""
+    session = boto3.session.Session(region_name=settings.AWS_REGION)
+    return session.client(
+        "cognito-idp",
+        config=Config(
+            max_pool_connections=64,
+            retries={"max_attempts": 5, "mode": "adaptive"},
+            tcp_keepalive=True,
+        ),
+    )
+
+
 class CognitoRepository:
     def __init__(self):
-        self.client = boto3.client("cognito-idp", region_name=settings.AWS_REGION)
+        self.client = get_cognito_client()
+        self._client_id = settings.COGNITO_CLIENT_ID
+        self._secret_bytes = settings.COGNITO_SECRET.encode("utf-8")
 
     def _secret_hash(self, email: str) -> str:
-        digest = hmac.new(
-            settings.COGNITO_SECRET.encode("utf-8"),
-            (email + settings.COGNITO_CLIENT_ID).encode("utf-8"),
-            hashlib.sha256,
-        ).digest()
-        return base64.b64encode(digest).decode()
+        return _compute_secret_hash(email, self._client_id, self._secret_bytes)
 
-    def _otpauth_url(self, label: str, secret: str, issuer: str = "MIWA") -> str:
-        return f"otpauth://totp/{quote(label)}?secret={secret}&issuer={quote(issuer)}&algorithm=SHA1&digits=6&period=30"
+    def _otpauth_url(self, label: str, secret: str) -> str:
+        return _OTPAUTH_TMPL.format(label=quote(label), secret=secret)
 
     def confirm_user(self, email: str, code: str):
         try:
             response = self.client.confirm_sign_up(
-                ClientId=settings.COGNITO_CLIENT_ID,
+                ClientId=self._client_id,
                 SecretHash=self._secret_hash(email),
                 Username=email,
                 ConfirmationCode=code,
@@ -46,23 +85,18 @@ class CognitoRepository:
             raise HTTPException(500, f"Error confirmando usuario: {err}")
 
     def sign_up_user(self, user_data: dict):
+        user_attributes = [{"Name": "updated_at", "Value": str(int(time()))}]
+        user_attributes.extend(
+            {"Name": name, "Value": value}
+            for name, value in zip(_SIGNUP_ATTR_KEYS, _signup_attr_values(user_data))
+        )
         try:
             response = self.client.sign_up(
-                ClientId=settings.COGNITO_CLIENT_ID,
+                ClientId=self._client_id,
                 SecretHash=self._secret_hash(user_data["email"]),
                 Username=user_data["email"],
                 Password=user_data["password"],
-                UserAttributes=[
-                    {"Name": "updated_at", "Value": str(int(time()))},
-                    {"Name": "nickname", "Value": user_data["nickname"]},
-                    {"Name": "address", "Value": user_data["address"]},
-                    {"Name": "birthdate", "Value": user_data["birthdate"]},
-                    {"Name": "gender", "Value": user_data["gender"]},
-                    {"Name": "picture", "Value": user_data["picture"]},
-                    {"Name": "phone_number", "Value": user_data["phone_number"]},
-                    {"Name": "family_name", "Value": user_data["family_name"]},
-                    {"Name": "name", "Value": user_data["name"]},
-                ],
+                UserAttributes=user_attributes,
             )
             return response
         except ClientError as e:
@@ -71,7 +105,7 @@ class CognitoRepository:
     def login_user(self, email: str, password: str):
         try:
             response = self.client.initiate_auth(
-                ClientId=settings.COGNITO_CLIENT_ID,
+                ClientId=self._client_id,
                 AuthFlow="USER_PASSWORD_AUTH",
                 AuthParameters={
                     "USERNAME": email,
@@ -107,10 +141,10 @@ class CognitoRepository:
             secret = resp["SecretCode"]
             # A veces devuelve una nueva Session; si no, reutiliza la recibida
             new_session = resp.get("Session", session)
-            label = f"MIWA:{email_for_label}"
+            label = f"{_OTPAUTH_ISSUER}:{email_for_label}"
             return {
                 "secret": secret,
-                "otpauth": self._otpauth_url(label=label, secret=secret, issuer="MIWA"),
+                "otpauth": self._otpauth_url(label=label, secret=secret),
                 "session": new_session,
             }
         except ClientError as e:
@@ -129,7 +163,7 @@ class CognitoRepository:
             next_session = resp.get("Session", session)
             # Completa el challenge MFA_SETUP
             resp = self.client.respond_to_auth_challenge(
-                ClientId=settings.COGNITO_CLIENT_ID,
+                ClientId=self._client_id,
                 ChallengeName="MFA_SETUP",
                 Session=next_session,
                 ChallengeResponses={
@@ -164,7 +198,7 @@ class CognitoRepository:
         """
         try:
             resp = self.client.respond_to_auth_challenge(
-                ClientId=settings.COGNITO_CLIENT_ID,
+                ClientId=self._client_id,
                 ChallengeName="SOFTWARE_TOKEN_MFA",
                 Session=session,
                 ChallengeResponses={
@@ -188,10 +222,10 @@ class CognitoRepository:
         try:
             resp = self.client.associate_software_token(AccessToken=access_token)
             secret = resp["SecretCode"]
-            label = f"MIWA:{email_for_label}"
+            label = f"{_OTPAUTH_ISSUER}:{email_for_label}"
             return {
                 "secret": secret,
-                "otpauth": self._otpauth_url(label=label, secret=secret, issuer="MIWA"),
+                "otpauth": self._otpauth_url(label=label, secret=secret),
             }
         except ClientError as e:
             raise e
@@ -1,21 +1,43 @@
 # deps/cognito_auth.py
+import hashlib
+import logging
+import threading
 import time
 from functools import lru_cache
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
-import boto3
 import requests
+from requests.adapters import HTTPAdapter
 from botocore.exceptions import ClientError
+from cachetools import TLRUCache, TTLCache
 from core.config import settings
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import jwk, jwt
-from jose.utils import base64url_decode
+from jwt.algorithms import RSAAlgorithm
+from jwt.utils import base64url_decode
+import orjson
 from pydantic import BaseModel
+from utils.cognito_repository import get_cognito_client
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")  # solo para FastAPI flow; no usado por Cognito
 
+logger = logging.getLogger(__name__)
+
+_RS256 = RSAAlgorithm(RSAAlgorithm.SHA256)
+
+# JWKS cacheado por 'kid'; se refresca por TTL en segundo plano o al ver un kid nuevo
+_JWKS_TTL_SECONDS = 3600
+_JWKS_MISS_REFRESH_SECONDS = 60
+_jwks_keys: Dict[str, Dict[str, str]] = {}
+_jwks_fetched_at = 0.0
+_jwks_attempted_at = float("-inf")  # último refresco en segundo plano, haya fallado o no
+_jwks_refresh_lock = threading.Lock()
+
+# sesión persistente: reutiliza la conexión TLS con Cognito entre refrescos
+_jwks_session = requests.Session()
+_jwks_session.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=4, max_retries=3))
+
 
 class TokenData(BaseModel):
     sub: str
@@ -26,37 +48,83 @@ class TokenData(BaseModel):
     exp: int
     user_id: Optional[int] = None
     role: Optional[str] = None
+    groups: List[str] = []  # "cognito:groups"
 
 
-@lru_cache(maxsize=1)
-def _get_jwks() -> Dict[str, Any]:
-    resp = requests.get(settings.COGNITO_JWKS_URL, timeout=5)
+def _fetch_jwks() -> Dict[str, Dict[str, str]]:
+    resp = _jwks_session.get(settings.COGNITO_JWKS_URL, timeout=5)
     resp.raise_for_status()
-    return resp.json()
+    return {k["kid"]: k for k in resp.json().get("keys", []) if k.get("kid")}
+
+
+def _store_jwks(keys: Dict[str, Dict[str, str]]) -> None:
+    global _jwks_keys, _jwks_fetched_at
+    _jwks_keys = keys
+    _jwks_fetched_at = time.monotonic()
+
+
+def _refresh_jwks(min_age: float) -> None:
+    # un solo hilo descarga a la vez; si otro acaba de refrescar, no repetimos
+    with _jwks_refresh_lock:
+        if _jwks_keys and time.monotonic() - _jwks_fetched_at < min_age:
+            return
+        _store_jwks(_fetch_jwks())
 
 
-@lru_cache(maxsize=1)
-def _get_cognito_client():
-    return boto3.client("cognito-idp", region_name=settings.AWS_REGION)
+def _refresh_jwks_in_background() -> None:
+    global _jwks_attempted_at
+    # si Cognito falla, _jwks_fetched_at no avanza: acotamos los reintentos igual que en el fallo de kid
+    if time.monotonic() - _jwks_attempted_at < _JWKS_MISS_REFRESH_SECONDS:
+        return
+    if not _jwks_refresh_lock.acquire(blocking=False):
+        return  # ya hay un refresco en curso
+    _jwks_attempted_at = time.monotonic()
+
+    def _run() -> None:
+        try:
+            _store_jwks(_fetch_jwks())
+        except Exception:
+            logger.warning("Unable to refresh Cognito JWKS; keeping cached keys", exc_info=True)
+        finally:
+            _jwks_refresh_lock.release()
+
+    threading.Thread(target=_run, name="jwks-refresh", daemon=True).start()
 
 
 def _find_key(kid: str) -> Optional[Dict[str, str]]:
-    jwks = _get_jwks()
-    for k in jwks.get("keys", []):
-        if k.get("kid") == kid:
-            return k
-    # si no encontramos, refrescamos el cache y reintenta una vez
-    _get_jwks.cache_clear()
-    jwks = _get_jwks()
-    for k in jwks.get("keys", []):
-        if k.get("kid") == kid:
-            return k
-    return None
+    key = _jwks_keys.get(kid)
+    age = time.monotonic() - _jwks_fetched_at
+    if key is not None:
+        # stale-while-revalidate: servimos la clave cacheada y refrescamos aparte
+        if age > _JWKS_TTL_SECONDS:
+            _refresh_jwks_in_background()
+        return key
+
+    # kid desconocido (rotación o primer uso): refresco síncrono, acotado en frecuencia
+    if not _jwks_keys or age > _JWKS_MISS_REFRESH_SECONDS:
+        _refresh_jwks(min_age=_JWKS_MISS_REFRESH_SECONDS)
+    return _jwks_keys.get(kid)
+
+
+@lru_cache(maxsize=16)
+def _load_public_key(n: str, e: str):
+    # parsear el JWK a una clave RSA de `cryptography` (OpenSSL) solo una vez por clave
+    return RSAAlgorithm.from_jwk({"kty": "RSA", "n": n, "e": e})
+
+
+def _decode_segment(segment: str) -> Dict[str, Any]:
+    return orjson.loads(base64url_decode(segment))
 
 
 def _verify_signature_and_get_claims(token: str) -> Dict[str, Any]:
+    # separamos el token una sola vez: header.payload.firma
+    try:
+        header_b64, payload_b64, encoded_sig = token.split(".")
+    except ValueError:
+        raise HTTPException(status_code=401, detail="Malformed token")
+
     # 1) localizar la clave por 'kid'
-    headers = jwt.get_unverified_header(token)
+    headers = _decode_segment(header_b64)
     kid = headers.get("kid")
     if not kid:
         raise HTTPException(status_code=401, detail="Missing kid header")
@@ -66,15 +134,14 @@ def _verify_signature_and_get_claims(token: str) -> Dict[str, Any]:
         raise HTTPException(status_code=401, detail="Key not found in JWKS")
 
     # 2) verificar firma a bajo nivel (RS256)
-    public_key = jwk.construct(key_dict)
-    message, encoded_sig = token.rsplit(".", 1)
-    decoded_sig = base64url_decode(encoded_sig.encode())
-    if not public_key.verify(message.encode(), decoded_sig):
+    public_key = _load_public_key(key_dict["n"], key_dict["e"])
+    message = token[: len(header_b64) + 1 + len(payload_b64)]
+    decoded_sig = base64url_decode(encoded_sig)
+    if not _RS256.verify(message.encode(), public_key, decoded_sig):
         raise HTTPException(status_code=401, detail="Invalid token signature")
 
-    # 3) leer claims sin verificar (la firma ya la validamos arriba)
-    claims = jwt.get_unverified_claims(token)
-    return claims
+    # 3) decodificar claims (la firma ya la validamos arriba)
+    return _decode_segment(payload_b64)
 
 
 def _validate_claims(claims: Dict[str, Any], expected_use: str = "access") -> TokenData:
@@ -89,9 +156,8 @@ def _validate_claims(claims: Dict[str, Any], expected_use: str = "access") -> To
         raise HTTPException(status_code=401, detail="Invalid issuer")
 
     # aud/client_id (Cognito usa 'aud' en ID tokens y 'client_id' en access tokens)
-    aud_ok = (claims.get("aud") == settings.COGNITO_CLIENT_ID) or (
-        claims.get("client_id") == settings.COGNITO_CLIENT_ID
-    )
+    client_id = settings.COGNITO_CLIENT_ID
+    aud_ok = claims.get("aud") == client_id or claims.get("client_id") == client_id
     if not aud_ok:
         raise HTTPException(status_code=401, detail="Invalid audience")
 
@@ -107,9 +173,14 @@ def _validate_claims(claims: Dict[str, Any], expected_use: str = "access") -> To
         scope=claims.get("scope"),
         token_use=claims["token_use"],
         exp=int(claims["exp"]),
+        groups=claims.get("cognito:groups") or [],
     )
 
 
+# (email, username) por 'sub' obtenidos vía get_user; 15 min para respetar cambios de atributos
+_profile_cache: TTLCache = TTLCache(maxsize=50_000, ttl=900)
+
+
 def _enrich_from_cognito(data: TokenData, access_token: str) -> TokenData:
     needs_email = data.email is None
     username_is_sub = data.username in (None, data.sub)
@@ -117,18 +188,23 @@ def _enrich_from_cognito(data: TokenData, access_token: str) -> TokenData:
     if not needs_email and not username_is_sub:
         return data
 
-    client = _get_cognito_client()
-    try:
-        response = client.get_user(AccessToken=access_token)
-    except ClientError as exc:
-        error_code = exc.response["Error"].get("Code")
-        if error_code in {"NotAuthorizedException", "InvalidParameterException"}:
-            raise HTTPException(status_code=401, detail="Invalid authentication credentials")
-        raise HTTPException(status_code=500, detail="Unable to retrieve user information from Cognito")
-
-    attributes = {item["Name"]: item["Value"] for item in response.get("UserAttributes", [])}
-    email = attributes.get("email")
-    username = email or response.get("Username")
+    cached = _profile_cache.get(data.sub)
+    if cached is not None:
+        email, username = cached
+    else:
+        client = get_cognito_client()
+        try:
+            response = client.get_user(AccessToken=access_token)
+        except ClientError as exc:
+            error_code = exc.response["Error"].get("Code")
+            if error_code in {"NotAuthorizedException", "InvalidParameterException"}:
+                raise HTTPException(status_code=401, detail="Invalid authentication credentials")
+            raise HTTPException(status_code=500, detail="Unable to retrieve user information from Cognito")
+
+        attributes = {item["Name"]: item["Value"] for item in response.get("UserAttributes", [])}
+        email = attributes.get("email")
+        username = email or response.get("Username")
+        _profile_cache[data.sub] = (email, username)
 
     return data.copy(update={
         "email": email if needs_email else data.email,
@@ -136,11 +212,30 @@ def _enrich_from_cognito(data: TokenData, access_token: str) -> TokenData:
     })
 
 
+# tokens ya verificados, por huella del token; evita repetir RSA + parseo en cada request
+_TOKEN_CACHE_TTL_SECONDS = 60
+
+
+def _token_ttu(_key: bytes, data: TokenData, now: float) -> float:
+    # nunca más allá del 'exp' del propio token
+    return min(now + _TOKEN_CACHE_TTL_SECONDS, data.exp)
+
+
+_token_cache: TLRUCache = TLRUCache(maxsize=10_000, ttu=_token_ttu, timer=time.time)
+
+
 async def get_current_user(token: str = Depends(oauth2_scheme)) -> TokenData:
+    fingerprint = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    cached = _token_cache.get(fingerprint)
+    if cached is not None and cached.exp > time.time():
+        return cached
+
     try:
         claims = _verify_signature_and_get_claims(token)
         data = _validate_claims(claims, expected_use="access")  # tu API debe recibir ACCESS TOKENS
-        return _enrich_from_cognito(data, token)
+        data = _enrich_from_cognito(data, token)
+        _token_cache[fingerprint] = data
+        return data
     except HTTPException:
         raise
     except Exception:
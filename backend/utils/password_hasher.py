@@ -1,11 +1,15 @@
 from passlib.context import CryptContext
 
+# Initialize the password context with bcrypt hashing algorithm
+# and set deprecated to auto to use the latest version.
+# Built once at import: CryptContext parsing/backend probing is not free,
+# and passlib dispatches bcrypt to the C extension from the bcrypt package.
+_pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
 
 class Hash:
     def __init__(self):
-        # Initialize the password context with bcrypt hashing algorithm
-        # and set deprecated to auto to use the latest version
-        self.pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+        self.pwd_context = _pwd_context
 
     def verify_password(self, plain_password, hashed_password):
         return self.pwd_context.verify(plain_password, hashed_password)
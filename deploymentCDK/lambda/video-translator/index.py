@@ -1,45 +1,74 @@
 """Lambda function for video translation using AWS Transcribe and Translate - v2"""
+import gzip
 import json
 import boto3
+import ijson
+import orjson
+from botocore.config import Config
 import logging
 import os
+import re
+import string
 import urllib.parse
-from typing import Any, Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
 
 # Configurar logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-# Clientes AWS
-s3_client = boto3.client('s3')
-transcribe_client = boto3.client('transcribe')
-translate_client = boto3.client('translate')
-comprehend_client = boto3.client('comprehend')
+# Clientes AWS (se reutilizan entre invocaciones del mismo contenedor)
+_BOTO_CONFIG = Config(max_pool_connections=50, retries={'max_attempts': 5, 'mode': 'adaptive'})
+s3_client = boto3.client('s3', config=_BOTO_CONFIG)
+transcribe_client = boto3.client('transcribe', config=_BOTO_CONFIG)
+translate_client = boto3.client('translate', config=_BOTO_CONFIG)
 
 # Configuración
 BUCKET_NAME = os.environ.get('BUCKET_NAME')
 TARGET_LANGUAGES = ['en', 'es', 'fr', 'pt', 'de']  # Idiomas objetivo
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv', '.webm')
+MEDIA_FORMATS = frozenset(ext[1:] for ext in VIDEO_EXTENSIONS)
+# Máximo de records S3 procesados en paralelo por invocación
+MAX_RECORD_WORKERS = 16
+# Máximo de chunks traducidos en paralelo por idioma
+MAX_CHUNK_WORKERS = 8
+# Fin de oración: se parte el texto después de . ! ? seguidos de espacio
+_SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+')
+_WHITESPACE = re.compile(r'\s+')
+# Códigos de Transcribe que no se reducen a su idioma base en Translate:
+# variantes regionales que Translate soporta tal cual, y los que no tiene (None)
+_TRANSCRIBE_TO_TRANSLATE: Dict[str, Optional[str]] = {
+    'es-MX': 'es-MX',
+    'fa-AF': 'fa-AF',
+    'fr-CA': 'fr-CA',
+    'pt-PT': 'pt-PT',
+    'zh-TW': 'zh-TW',
+    'zh-HK': None,  # cantonés: Translate no lo soporta, se detecta con 'auto'
+}
+# Prefijo de los jobs de esta Lambda; la regla de EventBridge filtra por él
+JOB_NAME_PREFIX = 'miwa-translation-'
 
 
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """Procesa videos subidos a S3 y genera transcripciones y traducciones."""
     
     try:
-        logger.info(f"Evento recibido: {json.dumps(event)}")
-        
-        # Procesar cada record del evento S3
-        for record in event.get('Records', []):
-            if record.get('eventSource') == 'aws:s3':
-                bucket_name = record['s3']['bucket']['name']
-                object_key = urllib.parse.unquote_plus(record['s3']['object']['key'])
-                
-                logger.info(f"Procesando archivo: {object_key} en bucket: {bucket_name}")
-                
-                # Verificar si es un archivo de video
-                if is_video_file(object_key):
-                    process_video(bucket_name, object_key)
-                else:
-                    logger.info(f"Archivo no es un video, ignorando: {object_key}")
+        # Solo se formatea si DEBUG está activo (en producción el nivel es INFO)
+        logger.debug("Evento recibido: %s", event)
+        
+        # Filtrar primero los videos; si no hay ninguno no se crea el pool
+        videos = _videos_from_records(event.get('Records', []))
+        
+        # Procesar los videos en paralelo (cada uno es I/O independiente)
+        if videos:
+            with ThreadPoolExecutor(max_workers=min(MAX_RECORD_WORKERS, len(videos))) as executor:
+                futures = [
+                    executor.submit(process_video, bucket_name, object_key)
+                    for bucket_name, object_key in videos
+                ]
+                for future in futures:
+                    future.result()
         
         return {
             'statusCode': 200,
@@ -54,10 +83,94 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         }
 
 
+def _videos_from_records(records: List[Dict[str, Any]]) -> List[Tuple[str, str]]:
+    """Devuelve (bucket, key) de los records S3 que son videos."""
+    videos = []
+    for record in records:
+        if record.get('eventSource') != 'aws:s3':
+            continue
+        
+        s3_info = record['s3']
+        object_key = urllib.parse.unquote_plus(s3_info['object']['key'])
+        
+        # Verificar si es un archivo de video
+        if not is_video_file(object_key):
+            logger.debug("Archivo no es un video, ignorando: %s", object_key)
+            continue
+        
+        bucket_name = s3_info['bucket']['name']
+        logger.debug("Procesando archivo: %s en bucket: %s", object_key, bucket_name)
+        videos.append((bucket_name, object_key))
+    return videos
+
+
+def complete_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """Procesa el evento 'Transcribe Job State Change' de EventBridge y genera traducciones."""
+    
+    try:
+        detail = event.get('detail', {})
+        job_name = detail.get('TranscriptionJobName')
+        status = detail.get('TranscriptionJobStatus')
+        
+        logger.info(f"Estado del job {job_name}: {status}")
+        
+        if status != 'COMPLETED':
+            logger.error(f"Job de transcripción falló: {job_name}")
+            return {
+                'statusCode': 200,
+                'body': json.dumps(f'Job {job_name} terminó con estado {status}')
+            }
+        
+        # Recuperar el video original a partir del MediaFileUri del job
+        transcription_job = transcribe_client.get_transcription_job(
+            TranscriptionJobName=job_name
+        )['TranscriptionJob']
+        bucket_name, object_key = parse_media_uri(transcription_job['Media']['MediaFileUri'])
+        user_email, file_name = _parse_key(object_key)
+        
+        process_completed_transcription(
+            transcription_job, object_key, bucket_name, user_email, file_name
+        )
+        
+        return {
+            'statusCode': 200,
+            'body': json.dumps('Transcripción procesada exitosamente')
+        }
+        
+    except Exception as e:
+        logger.error(f"Error procesando evento de Transcribe: {str(e)}")
+        return {
+            'statusCode': 500,
+            'body': json.dumps(f'Error: {str(e)}')
+        }
+
+
+def parse_media_uri(media_uri: str) -> Tuple[str, str]:
+    """Separa un URI s3://bucket/key en (bucket, key)."""
+    bucket_name, _, object_key = media_uri[len('s3://'):].partition('/')
+    return bucket_name, object_key
+
+
+def _parse_key(object_key: str) -> Tuple[Optional[str], str]:
+    """Devuelve (usuario_email, archivo) para claves {usuario_email}/uploads/{archivo}.
+    
+    Si la clave no tiene ese formato devuelve (None, object_key)."""
+    parts = object_key.split('/', 2)
+    if len(parts) == 3 and parts[1] == 'uploads':
+        return parts[0], parts[2].rsplit('/', 1)[-1]
+    return None, object_key
+
+
+def _transcript_key(user_email: Optional[str], job_name: str) -> str:
+    """Clave del JSON que Transcribe escribe en nuestro bucket."""
+    if user_email:
+        return f"{user_email}/transcriptions/{job_name}.json"
+    return f"transcriptions/{job_name}.json"  # Fallback
+
+
 def is_video_file(file_key: str) -> bool:
     """Verifica si el archivo es un video basándose en su extensión."""
-    video_extensions = ['.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv', '.webm']
-    return any(file_key.lower().endswith(ext) for ext in video_extensions)
+    return file_key.lower().endswith(VIDEO_EXTENSIONS)
 
 
 def process_video(bucket_name: str, object_key: str) -> None:
@@ -68,49 +181,63 @@ def process_video(bucket_name: str, object_key: str) -> None:
         
         # 1. Generar nombre único para el job de transcripción
         job_name = generate_job_name(object_key)
+        user_email, _ = _parse_key(object_key)
         
-        # 2. Iniciar transcripción
-        transcription_result = start_transcription_job(bucket_name, object_key, job_name)
-        
-        if transcription_result:
-            # 3. Generar traducciones
-            process_completed_transcription(transcription_result, object_key, bucket_name)
-        else:
+        # 2. Iniciar transcripción; las traducciones se generan en complete_handler
+        # cuando EventBridge notifica que el job terminó
+        if not start_transcription_job(bucket_name, object_key, job_name, user_email):
             logger.error(f"Falló la transcripción para {object_key}")
         
     except Exception as e:
         logger.error(f"Error procesando video {object_key}: {str(e)}")
 
 
+class _JobNameTable(dict):
+    """Tabla para str.translate: deja [0-9a-zA-Z._-] y cambia el resto por '_'.
+    
+    Se completa bajo demanda, así cubre cualquier code point (incluido Unicode)."""
+    
+    def __missing__(self, codepoint: int) -> str:
+        char = chr(codepoint)
+        value = char if char in _JOB_NAME_ALLOWED else '_'
+        self[codepoint] = value
+        return value
+
+
+_JOB_NAME_ALLOWED = frozenset(string.ascii_letters + string.digits + '._-')
+_JOB_NAME_TABLE = _JobNameTable()
+
+
 def generate_job_name(object_key: str) -> str:
     """Genera un nombre único para el job de transcripción."""
     import time
-    import re
     # Remover caracteres no válidos (solo permitir [0-9a-zA-Z._-])
-    clean_name = re.sub(r'[^0-9a-zA-Z._-]', '_', object_key)
+    clean_name = object_key.translate(_JOB_NAME_TABLE)
     timestamp = int(time.time())
-    job_name = f"miwa-transcription-{clean_name}-{timestamp}"
+    job_name = f"{JOB_NAME_PREFIX}{clean_name}-{timestamp}"
     # Asegurar que no exceda 200 caracteres (límite de Transcribe)
     return job_name[:200]
 
 
+def _ext(file_key: str) -> str:
+    """Extensión del archivo en minúsculas y sin punto ('' si no tiene)."""
+    return os.path.splitext(file_key)[1][1:].lower()
+
+
+@lru_cache(maxsize=16)
+def _format_for_ext(extension: str) -> str:
+    return extension if extension in MEDIA_FORMATS else 'mp4'  # Default a mp4
+
+
 def get_media_format(file_key: str) -> str:
     """Determina el formato de media basándose en la extensión del archivo."""
-    extension = file_key.lower().split('.')[-1]
-    format_mapping = {
-        'mp4': 'mp4',
-        'mov': 'mov',
-        'avi': 'avi',
-        'mkv': 'mkv',
-        'wmv': 'wmv',
-        'flv': 'flv',
-        'webm': 'webm',
-    }
-    return format_mapping.get(extension, 'mp4')  # Default a mp4
-
-
-def start_transcription_job(bucket_name: str, object_key: str, job_name: str) -> Optional[Dict[str, Any]]:
-    """Inicia un job de transcripción en AWS Transcribe."""
+    return _format_for_ext(_ext(file_key))
+
+
+def start_transcription_job(
+    bucket_name: str, object_key: str, job_name: str, user_email: Optional[str]
+) -> Optional[str]:
+    """Inicia un job de transcripción en AWS Transcribe y devuelve su nombre."""
     
     try:
         media_uri = f"s3://{bucket_name}/{object_key}"
@@ -118,15 +245,8 @@ def start_transcription_job(bucket_name: str, object_key: str, job_name: str) ->
         
         logger.info(f"Iniciando transcripción para: {media_uri}")
         
-        # Extraer usuario del path para guardar transcripción en su carpeta
-        # Formato: {usuario_email}/uploads/{archivo}
-        path_parts = object_key.split('/')
-        if len(path_parts) >= 3 and path_parts[1] == 'uploads':
-            user_email = path_parts[0]
-            output_key = f"{user_email}/transcriptions/{job_name}.json"
-        else:
-            # Fallback
-            output_key = f"transcriptions/{job_name}.json"
+        # Guardar la transcripción en la carpeta del usuario
+        output_key = _transcript_key(user_email, job_name)
         
         # Configurar el job de transcripción
         job_config = {
@@ -139,81 +259,67 @@ def start_transcription_job(bucket_name: str, object_key: str, job_name: str) ->
         }
         
         # Iniciar el job
-        response = transcribe_client.start_transcription_job(**job_config)
+        transcribe_client.start_transcription_job(**job_config)
         logger.info(f"Job de transcripción iniciado: {job_name}")
         
-        # Esperar a que el job termine
-        return wait_for_transcription_job(job_name)
+        return job_name
         
     except Exception as e:
         logger.error(f"Error iniciando transcripción: {str(e)}")
         return None
 
 
-def wait_for_transcription_job(job_name: str, max_wait_time: int = 600) -> Optional[Dict[str, Any]]:
-    """Espera a que termine el job de transcripción."""
-    
-    import time
-    start_time = time.time()
-    
-    while time.time() - start_time < max_wait_time:
-        try:
-            response = transcribe_client.get_transcription_job(TranscriptionJobName=job_name)
-            status = response['TranscriptionJob']['TranscriptionJobStatus']
-            
-            logger.info(f"Estado del job {job_name}: {status}")
-            
-            if status == 'COMPLETED':
-                return response['TranscriptionJob']
-            elif status == 'FAILED':
-                logger.error(f"Job de transcripción falló: {job_name}")
-                return None
-            
-            # Esperar antes de verificar de nuevo
-            time.sleep(30)
-            
-        except Exception as e:
-            logger.error(f"Error verificando estado del job: {str(e)}")
-            return None
-    
-    logger.error(f"Timeout esperando job de transcripción: {job_name}")
-    return None
-
-
-def process_completed_transcription(transcription_job: Dict[str, Any], original_key: str, bucket_name: str) -> None:
+def process_completed_transcription(
+    transcription_job: Dict[str, Any],
+    original_key: str,
+    bucket_name: str,
+    user_email: Optional[str],
+    file_name: str,
+) -> None:
     """Procesa el resultado de la transcripción y genera traducciones."""
     
     try:
         # Obtener el texto transcrito desde nuestro bucket
         job_name = transcription_job['TranscriptionJobName']
         
-        # Determinar la ubicación del archivo de transcripción según el path original
-        path_parts = original_key.split('/')
-        if len(path_parts) >= 3 and path_parts[1] == 'uploads':
-            user_email = path_parts[0]
-            transcript_key = f"{user_email}/transcriptions/{job_name}.json"
-        else:
-            # Fallback
-            transcript_key = f"transcriptions/{job_name}.json"
-        
-        transcript_text = get_transcript_text_from_s3(bucket_name, transcript_key)
+        transcript_text = get_transcript_text_from_s3(bucket_name, _transcript_key(user_email, job_name))
         
         if not transcript_text:
             logger.error("No se pudo obtener el texto transcrito")
             return
         
-        # Detectar idioma original
-        detected_language = detect_language(transcript_text)
-        logger.info(f"Idioma detectado: {detected_language}")
+        # Idioma original: Transcribe ya lo identificó (IdentifyLanguage) y viene en el
+        # job que tenemos en memoria; si falta, Translate lo detecta con 'auto'
+        source_language = get_job_language(transcription_job) or 'auto'
         
-        # Generar traducciones
+        # Generar traducciones en paralelo (una llamada independiente por idioma)
+        # Se omite el idioma base del original (fr-CA no se traduce a fr)
+        source_base = source_language.split('-', 1)[0]
+        target_langs = [lang for lang in TARGET_LANGUAGES if lang != source_base]
         translations = {}
-        for target_lang in TARGET_LANGUAGES:
-            if target_lang != detected_language:
-                translated_text = translate_text(transcript_text, detected_language, target_lang)
-                if translated_text:
+        detected_languages = []
+        with ThreadPoolExecutor(max_workers=max(1, len(target_langs))) as executor:
+            futures = {
+                lang: executor.submit(translate_text, transcript_text, source_language, lang)
+                for lang in target_langs
+            }
+            for target_lang, future in futures.items():
+                translated = future.result()
+                if not translated:
+                    continue
+                translated_text, detected = translated
+                detected_languages.append(detected)
+                # Con 'auto' el idioma original puede estar entre los objetivos
+                if detected != target_lang:
                     translations[target_lang] = translated_text
         
+        # El código regional solo se usa para Translate; se guarda el idioma base como hasta ahora
+        if source_language != 'auto':
+            detected_language = source_base
+        else:
+            detected_language = detected_languages[0] if detected_languages else 'en'  # Default a inglés
+        logger.info(f"Idioma detectado: {detected_language}")
+        
         # Preparar resultado final
         completion_time = transcription_job.get('CompletionTime', '')
         if completion_time and hasattr(completion_time, 'isoformat'):
@@ -228,7 +334,7 @@ def process_completed_transcription(transcription_job: Dict[str, Any], original_
         }
         
         # Guardar resultado en S3
-        save_translation_result(bucket_name, original_key, result)
+        save_translation_result(bucket_name, original_key, result, user_email, file_name)
         
     except Exception as e:
         logger.error(f"Error procesando transcripción completada: {str(e)}")
@@ -242,15 +348,18 @@ def get_transcript_text_from_s3(bucket_name: str, transcript_key: str) -> Option
         
         # Descargar el archivo de transcripción desde nuestro bucket
         response = s3_client.get_object(Bucket=bucket_name, Key=transcript_key)
-        transcript_data = json.loads(response['Body'].read().decode('utf-8'))
+        body = response['Body']
+        
+        # Extraer el texto en streaming: se detiene en el primer transcript sin
+        # cargar en memoria el resto del JSON (items/segmentos por palabra)
+        try:
+            text = next(ijson.items(body, 'results.transcripts.item.transcript'), None)
+        finally:
+            body.close()
         
-        # Extraer el texto
-        if 'results' in transcript_data and 'transcripts' in transcript_data['results']:
-            transcripts = transcript_data['results']['transcripts']
-            if transcripts and len(transcripts) > 0:
-                text = transcripts[0].get('transcript', '')
-                logger.info(f"Texto transcrito extraído exitosamente ({len(text)} caracteres)")
-                return text
+        if text is not None:
+            logger.info(f"Texto transcrito extraído exitosamente ({len(text)} caracteres)")
+            return text
         
         logger.error("No se encontró texto en el archivo de transcripción")
         return None
@@ -260,26 +369,55 @@ def get_transcript_text_from_s3(bucket_name: str, transcript_key: str) -> Option
         return None
 
 
-def detect_language(text: str) -> str:
-    """Detecta el idioma del texto usando AWS Comprehend."""
+def get_job_language(transcription_job: Dict[str, Any]) -> Optional[str]:
+    """Devuelve el idioma identificado por Transcribe como código de Translate.
     
-    try:
-        response = comprehend_client.detect_dominant_language(Text=text[:5000])  # Límite de caracteres
-        languages = response.get('Languages', [])
-        if languages:
-            detected_lang = languages[0]['LanguageCode']
-            logger.info(f"Idioma detectado: {detected_lang} (confianza: {languages[0]['Score']})")
-            return detected_lang
-        
-        return 'en'  # Default a inglés
-        
-    except Exception as e:
-        logger.error(f"Error detectando idioma: {str(e)}")
-        return 'en'
+    Las variantes regionales que Translate distingue se conservan (zh-TW, fr-CA,
+    pt-PT...); el resto se reduce al idioma base (es-US -> es). None si Translate
+    debe detectarlo con 'auto'."""
+    language_code = transcription_job.get('LanguageCode')
+    if not language_code:
+        return None
+    if language_code in _TRANSCRIBE_TO_TRANSLATE:
+        return _TRANSCRIBE_TO_TRANSLATE[language_code]
+    return language_code.split('-', 1)[0]
 
 
-def translate_text(text: str, source_lang: str, target_lang: str) -> Optional[str]:
-    """Traduce texto usando AWS Translate."""
+def _last_cut(pattern: re.Pattern, window: str) -> int:
+    """Posición justo después del último match de pattern en window (0 si no hay)."""
+    cut = 0
+    for match in pattern.finditer(window):
+        cut = match.end()
+    return cut
+
+
+def split_text(text: str, max_chars: int) -> List[str]:
+    """Divide el texto en chunks de hasta max_chars sin cortar oraciones ni palabras.
+    
+    Los chunks son tramos consecutivos del texto, así que ''.join(chunks) == text."""
+    chunks: List[str] = []
+    start = 0
+    while len(text) - start > max_chars:
+        window = text[start:start + max_chars]
+        # Se corta tras el último fin de oración; si no hay, tras el último espacio.
+        # Una "palabra" más larga que el límite solo se puede cortar a ciegas
+        cut = (
+            _last_cut(_SENTENCE_BOUNDARY, window)
+            or _last_cut(_WHITESPACE, window)
+            or max_chars
+        )
+        chunks.append(text[start:start + cut])
+        start += cut
+    if start < len(text):
+        chunks.append(text[start:])
+    return chunks
+
+
+def translate_text(text: str, source_lang: str, target_lang: str) -> Optional[Tuple[str, str]]:
+    """Traduce texto usando AWS Translate.
+    
+    Devuelve (texto_traducido, idioma_origen); con source_lang='auto' el idioma
+    origen es el que detectó Translate."""
     
     try:
         # AWS Translate tiene límite de caracteres, dividir si es necesario
@@ -290,53 +428,56 @@ def translate_text(text: str, source_lang: str, target_lang: str) -> Optional[st
                 SourceLanguageCode=source_lang,
                 TargetLanguageCode=target_lang
             )
-            return response['TranslatedText']
+            return response['TranslatedText'], response['SourceLanguageCode']
         else:
-            # Dividir texto en chunks
-            chunks = [text[i:i+max_chars] for i in range(0, len(text), max_chars)]
-            translated_chunks = []
+            # Dividir texto en chunks y traducirlos en paralelo; map conserva el orden
+            chunks = split_text(text, max_chars)
             
-            for chunk in chunks:
-                response = translate_client.translate_text(
+            def _translate_chunk(chunk: str) -> Dict[str, Any]:
+                return translate_client.translate_text(
                     Text=chunk,
                     SourceLanguageCode=source_lang,
                     TargetLanguageCode=target_lang
                 )
-                translated_chunks.append(response['TranslatedText'])
             
-            return ' '.join(translated_chunks)
+            with ThreadPoolExecutor(max_workers=min(MAX_CHUNK_WORKERS, len(chunks))) as executor:
+                responses = list(executor.map(_translate_chunk, chunks))
+            
+            translated = ' '.join(response['TranslatedText'] for response in responses)
+            return translated, responses[0]['SourceLanguageCode']
             
     except Exception as e:
         logger.error(f"Error traduciendo texto de {source_lang} a {target_lang}: {str(e)}")
         return None
 
 
-def save_translation_result(bucket_name: str, original_key: str, result: Dict[str, Any]) -> None:
+def save_translation_result(
+    bucket_name: str,
+    original_key: str,
+    result: Dict[str, Any],
+    user_email: Optional[str],
+    file_name: str,
+) -> None:
     """Guarda el resultado de la traducción en S3 manteniendo estructura de usuario."""
     
     try:
-        # Extraer usuario y nombre de archivo del path original
-        # Formato esperado: {usuario_email}/uploads/{archivo}
-        path_parts = original_key.split('/')
-        
-        if len(path_parts) >= 3 and path_parts[1] == 'uploads':
-            user_email = path_parts[0]
-            file_name = path_parts[-1]
-            base_name = file_name.rsplit('.', 1)[0]  # Remover extensión
-            
+        base_name = file_name.rsplit('.', 1)[0]  # Remover extensión
+        if user_email:
             # Guardar en /{usuario}/transcriptions/{archivo}_translations.json
             result_key = f"{user_email}/transcriptions/{base_name}_translations.json"
         else:
             # Fallback si el path no tiene el formato esperado
-            base_name = original_key.rsplit('.', 1)[0]
             result_key = f"translations/{base_name}_translations.json"
         
-        # Guardar en S3
+        # Guardar en S3: JSON compacto comprimido con gzip (los clientes HTTP lo
+        # descomprimen solos gracias a Content-Encoding)
+        body = gzip.compress(orjson.dumps(result), compresslevel=6)
         s3_client.put_object(
             Bucket=bucket_name,
             Key=result_key,
-            Body=json.dumps(result, ensure_ascii=False, indent=2),
+            Body=body,
             ContentType='application/json',
+            ContentEncoding='gzip',
             Metadata={
                 'original-file': original_key,
                 'processed-by': 'miwa-video-translator'
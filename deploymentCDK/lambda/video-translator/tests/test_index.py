@@ -0,0 +1,256 @@
+import gzip
+import io
+import os
+import re
+from datetime import datetime, timezone
+
+import orjson
+import pytest
+from botocore.response import StreamingBody
+from botocore.stub import ANY, Stubber
+
+# Los clientes boto3 se crean al importar el módulo y necesitan una región
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+import index  # noqa: E402
+
+MAX_CHARS = 5000
+
+
+# ---------------------------------------------------------------------------
+# split_text
+# ---------------------------------------------------------------------------
+
+def _sentences(count):
+    return " ".join(f"Sentence number {i} talks about the meeting agenda." for i in range(count))
+
+
+TEXTS = [
+    pytest.param("", id="empty"),
+    pytest.param("Short text.", id="single-sentence"),
+    pytest.param("a" * MAX_CHARS, id="exactly-at-limit"),
+    pytest.param(_sentences(400), id="many-sentences"),
+    pytest.param(" ".join(["palabra"] * 2000), id="one-long-sentence"),
+    pytest.param("x" * (MAX_CHARS * 2 + 17), id="word-longer-than-limit"),
+    pytest.param(_sentences(50) + " " + "y" * 7000 + " " + _sentences(50), id="long-word-between-sentences"),
+    pytest.param("¿Qué tal? ¡Muy bien! " * 600, id="unicode-punctuation"),
+    pytest.param("Line one.\n\nLine two.\t" * 900, id="mixed-whitespace"),
+]
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_split_text_chunks_fit_and_rejoin(text):
+    chunks = index.split_text(text, MAX_CHARS)
+
+    assert all(0 < len(chunk) <= MAX_CHARS for chunk in chunks)
+    assert "".join(chunks) == text
+
+
+def test_split_text_cuts_after_sentence_end():
+    chunks = index.split_text(_sentences(400), MAX_CHARS)
+
+    assert len(chunks) > 1
+    # Todos menos el último terminan en fin de oración más su espacio
+    assert all(re.search(r"[.!?]\s+$", chunk) for chunk in chunks[:-1])
+
+
+def test_split_text_cuts_between_words_when_no_sentence_end():
+    chunks = index.split_text(" ".join(["palabra"] * 2000), MAX_CHARS)
+
+    assert len(chunks) > 1
+    assert all(chunk.endswith(" ") for chunk in chunks[:-1])
+    assert all(set(chunk.split()) == {"palabra"} for chunk in chunks)
+
+
+# ---------------------------------------------------------------------------
+# _parse_key / generate_job_name
+# ---------------------------------------------------------------------------
+
+def _old_parse_key(object_key):
+    """Lógica anterior, repetida en cada helper antes de _parse_key."""
+    path_parts = object_key.split("/")
+    if len(path_parts) >= 3 and path_parts[1] == "uploads":
+        return path_parts[0], path_parts[-1]
+    return None, object_key
+
+
+KEYS = [
+    "user@example.com/uploads/video.mp4",
+    "user@example.com/uploads/nested/dir/video.mp4",
+    "user@example.com/uploads/",
+    "user@example.com/uploads",
+    "user@example.com/other/video.mp4",
+    "uploads/user@example.com/video.mp4",
+    "video.mp4",
+    "",
+    "josé@dominio.com/uploads/presentación final.mov",
+]
+
+
+@pytest.mark.parametrize("key", KEYS)
+def test_parse_key_matches_previous_split_logic(key):
+    assert index._parse_key(key) == _old_parse_key(key)
+
+
+@pytest.mark.parametrize("key", KEYS)
+def test_generate_job_name_matches_previous_regex(key, monkeypatch):
+    monkeypatch.setattr("time.time", lambda: 1700000000)
+    expected = f"{index.JOB_NAME_PREFIX}{re.sub(r'[^0-9a-zA-Z._-]', '_', key)}-1700000000"[:200]
+
+    assert index.generate_job_name(key) == expected
+
+
+# ---------------------------------------------------------------------------
+# get_job_language
+# ---------------------------------------------------------------------------
+
+@pytest.mark.parametrize(
+    ("transcribe_code", "translate_code"),
+    [
+        ("es-US", "es"),
+        ("en-GB", "en"),
+        ("pt-BR", "pt"),
+        ("zh-CN", "zh"),
+        ("de-CH", "de"),
+        ("zh-TW", "zh-TW"),
+        ("fr-CA", "fr-CA"),
+        ("pt-PT", "pt-PT"),
+        ("es-MX", "es-MX"),
+        ("fa-AF", "fa-AF"),
+        ("zh-HK", None),
+        (None, None),
+    ],
+)
+def test_get_job_language_keeps_translate_regional_codes(transcribe_code, translate_code):
+    job = {"LanguageCode": transcribe_code} if transcribe_code else {}
+
+    assert index.get_job_language(job) == translate_code
+
+
+# ---------------------------------------------------------------------------
+# complete_handler
+# ---------------------------------------------------------------------------
+
+def _event(status, job_name="miwa-translation-job-1"):
+    return {
+        "source": "aws.transcribe",
+        "detail-type": "Transcribe Job State Change",
+        "detail": {"TranscriptionJobName": job_name, "TranscriptionJobStatus": status},
+    }
+
+
+@pytest.fixture
+def transcribe_stub():
+    with Stubber(index.transcribe_client) as stubber:
+        yield stubber
+        stubber.assert_no_pending_responses()
+
+
+@pytest.fixture
+def s3_stub():
+    with Stubber(index.s3_client) as stubber:
+        yield stubber
+        stubber.assert_no_pending_responses()
+
+
+class _Capture:
+    """Acepta cualquier valor en expected_params y lo guarda para inspeccionarlo."""
+
+    value = None
+
+    def __eq__(self, other):
+        self.value = other
+        return True
+
+
+class _FakeTranslate:
+    """Traduce anteponiendo el idioma destino; registra las llamadas."""
+
+    def __init__(self):
+        self.calls = []
+
+    def translate_text(self, Text, SourceLanguageCode, TargetLanguageCode):
+        self.calls.append((SourceLanguageCode, TargetLanguageCode))
+        return {
+            "TranslatedText": f"[{TargetLanguageCode}] {Text}",
+            "SourceLanguageCode": SourceLanguageCode,
+        }
+
+
+@pytest.mark.parametrize("status", ["FAILED", "IN_PROGRESS", None])
+def test_complete_handler_ignores_non_completed_jobs(status, transcribe_stub, s3_stub):
+    # Sin respuestas en cola: cualquier llamada a Transcribe o S3 haría fallar el test
+    response = index.complete_handler(_event(status), None)
+
+    assert response["statusCode"] == 200
+
+
+def test_complete_handler_unknown_job_returns_500(transcribe_stub, s3_stub):
+    transcribe_stub.add_client_error(
+        "get_transcription_job",
+        service_error_code="BadRequestException",
+        service_message="The requested job couldn't be found.",
+        http_status_code=400,
+        expected_params={"TranscriptionJobName": "miwa-translation-missing"},
+    )
+
+    response = index.complete_handler(_event("COMPLETED", "miwa-translation-missing"), None)
+
+    assert response["statusCode"] == 500
+
+
+@pytest.mark.parametrize(
+    ("transcribe_code", "source", "original", "targets"),
+    [
+        ("es-US", "es", "es", ("de", "en", "fr", "pt")),
+        # La variante regional llega a Translate, pero el resultado guarda el idioma base
+        ("fr-CA", "fr-CA", "fr", ("de", "en", "es", "pt")),
+    ],
+)
+def test_complete_handler_translates_and_saves_result(
+    transcribe_code, source, original, targets, transcribe_stub, s3_stub, monkeypatch
+):
+    fake_translate = _FakeTranslate()
+    monkeypatch.setattr(index, "translate_client", fake_translate)
+    job_name = "miwa-translation-job-1"
+    transcript = orjson.dumps({"results": {"transcripts": [{"transcript": "Hola a todos."}]}})
+
+    transcribe_stub.add_response(
+        "get_transcription_job",
+        {
+            "TranscriptionJob": {
+                "TranscriptionJobName": job_name,
+                "LanguageCode": transcribe_code,
+                "Media": {"MediaFileUri": "s3://bucket/user@example.com/uploads/video.mp4"},
+                "CompletionTime": datetime(2025, 9, 5, tzinfo=timezone.utc),
+            }
+        },
+        expected_params={"TranscriptionJobName": job_name},
+    )
+    s3_stub.add_response(
+        "get_object",
+        {"Body": StreamingBody(io.BytesIO(transcript), len(transcript))},
+        expected_params={"Bucket": "bucket", "Key": f"user@example.com/transcriptions/{job_name}.json"},
+    )
+    body = _Capture()
+    s3_stub.add_response(
+        "put_object",
+        {},
+        expected_params={
+            "Bucket": "bucket",
+            "Key": "user@example.com/transcriptions/video_translations.json",
+            "Body": body,
+            "ContentType": "application/json",
+            "ContentEncoding": "gzip",
+            "Metadata": ANY,
+        },
+    )
+
+    response = index.complete_handler(_event("COMPLETED", job_name), None)
+
+    assert response["statusCode"] == 200
+    assert sorted(fake_translate.calls) == [(source, lang) for lang in targets]
+    result = orjson.loads(gzip.decompress(body.value))
+    assert result["original_language"] == original
+    assert result["original_text"] == "Hola a todos."
+    assert result["translations"] == {lang: f"[{lang}] Hola a todos." for lang in targets}
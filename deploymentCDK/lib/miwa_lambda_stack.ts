@@ -2,6 +2,8 @@ import { PythonFunction } from "@aws-cdk/aws-lambda-python-alpha";
 import * as cdk from "aws-cdk-lib";
 import { Duration, RemovalPolicy } from "aws-cdk-lib";
 import * as apigw from "aws-cdk-lib/aws-apigateway";
+import * as events from "aws-cdk-lib/aws-events";
+import * as targets from "aws-cdk-lib/aws-events-targets";
 import * as iam from "aws-cdk-lib/aws-iam";
 import * as lambda from "aws-cdk-lib/aws-lambda";
 import { Code, Function, Runtime } from "aws-cdk-lib/aws-lambda";
@@ -70,35 +72,72 @@ export class MiwaLambdaS3Stack extends cdk.Stack {
     miwaBucket.grantReadWrite(lambdaFn);
 
     // --- Lambda Video Translator ---
+    // Los tests de la Lambda viven junto a su código pero no se empaquetan
+    const videoTranslatorTestFiles = ["tests", "pytest.ini", "requirements-dev.txt"];
     const videoTranslatorFn = new PythonFunction(this, "video-translator-lambda", {
       entry: path.join(__dirname, "..", "lambda", "video-translator"),
       runtime: Runtime.PYTHON_3_11,
       index: "index.py",
       handler: "lambda_handler",
-      timeout: Duration.minutes(15), // Videos pueden tomar tiempo en procesar
+      // Solo inicia el job de Transcribe; ya no espera a que termine
+      timeout: Duration.minutes(1),
       memorySize: 1024,
       environment: {
         BUCKET_NAME: miwaBucket.bucketName,
       },
+      bundling: { assetExcludes: videoTranslatorTestFiles },
+    });
+
+    // --- Lambda Video Translator (completion) ---
+    // Se invoca desde EventBridge cuando termina un job de Transcribe
+    const videoTranslatorCompleteFn = new PythonFunction(this, "video-translator-complete-lambda", {
+      entry: path.join(__dirname, "..", "lambda", "video-translator"),
+      runtime: Runtime.PYTHON_3_11,
+      index: "index.py",
+      handler: "complete_handler",
+      timeout: Duration.minutes(5),
+      memorySize: 1024,
+      environment: {
+        BUCKET_NAME: miwaBucket.bucketName,
+      },
+      bundling: { assetExcludes: videoTranslatorTestFiles },
+    });
+
+    new events.Rule(this, "video-translator-transcribe-complete-rule", {
+      eventPattern: {
+        source: ["aws.transcribe"],
+        detailType: ["Transcribe Job State Change"],
+        detail: {
+          TranscriptionJobName: events.Match.prefix("miwa-translation-"),
+          TranscriptionJobStatus: ["COMPLETED", "FAILED"],
+        },
+      },
+      targets: [new targets.LambdaFunction(videoTranslatorCompleteFn)],
     });
 
     // Permisos para S3
     miwaBucket.grantReadWrite(videoTranslatorFn);
+    miwaBucket.grantReadWrite(videoTranslatorCompleteFn);
 
     // Permisos para AWS Transcribe
     videoTranslatorFn.addToRolePolicy(new iam.PolicyStatement({
       effect: iam.Effect.ALLOW,
       actions: [
         "transcribe:StartTranscriptionJob",
+      ],
+      resources: ["*"],
+    }));
+    videoTranslatorCompleteFn.addToRolePolicy(new iam.PolicyStatement({
+      effect: iam.Effect.ALLOW,
+      actions: [
         "transcribe:GetTranscriptionJob",
-        "transcribe:ListTranscriptionJobs",
       ],
       resources: ["*"],
     }));
 
     // Permisos para leer los resultados de Transcribe desde S3
     // Transcribe guarda los resultados JSON en buckets de sistema AWS
-    videoTranslatorFn.addToRolePolicy(new iam.PolicyStatement({
+    videoTranslatorCompleteFn.addToRolePolicy(new iam.PolicyStatement({
       effect: iam.Effect.ALLOW,
       actions: [
         "s3:GetObject",
@@ -107,7 +146,7 @@ export class MiwaLambdaS3Stack extends cdk.Stack {
     }));
 
     // Permisos para AWS Translate
-    videoTranslatorFn.addToRolePolicy(new iam.PolicyStatement({
+    videoTranslatorCompleteFn.addToRolePolicy(new iam.PolicyStatement({
       effect: iam.Effect.ALLOW,
       actions: [
         "translate:TranslateText",
@@ -115,8 +154,9 @@ export class MiwaLambdaS3Stack extends cdk.Stack {
       resources: ["*"],
     }));
 
-    // Permisos para AWS Comprehend (detección de idioma)
-    videoTranslatorFn.addToRolePolicy(new iam.PolicyStatement({
+    // Permisos para AWS Comprehend: Translate con SourceLanguageCode='auto'
+    // detecta el idioma llamando a Comprehend con la identidad de la Lambda
+    videoTranslatorCompleteFn.addToRolePolicy(new iam.PolicyStatement({
       effect: iam.Effect.ALLOW,
       actions: [
         "comprehend:DetectDominantLanguage",